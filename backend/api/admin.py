@@ -0,0 +1,37 @@
+from django.contrib import admin
+
+from .models import SlowQuery
+
+
+@admin.register(SlowQuery)
+class SlowQueryAdmin(admin.ModelAdmin):
+    list_display = [
+        'view',
+        'action',
+        'count',
+        'max_ms',
+        'total_ms',
+        'last_seen'
+    ]
+
+    list_filter = [
+        'view',
+        'action'
+    ]
+
+    search_fields = [
+        'sql'
+    ]
+
+    readonly_fields = [
+        'fingerprint',
+        'sql',
+        'view',
+        'action',
+        'count',
+        'total_ms',
+        'max_ms',
+        'plan',
+        'first_seen',
+        'last_seen'
+    ]
@@ -0,0 +1,62 @@
+"""Кэш справочников тегов и ингредиентов"""
+import hashlib
+import time
+from threading import Lock
+
+from django.core.cache import cache
+from django.http import HttpResponse, HttpResponseNotModified
+from django.utils.cache import patch_cache_control
+from django.utils.http import parse_etags
+from rest_framework.renderers import JSONRenderer
+
+from recipes.constants import CATALOG_CACHE_TTL, CATALOG_MAX_AGE
+from recipes.models import Ingredient, Tag
+from .serializers import IngredientSerializer, TagSerializer
+
+
+class Catalog:
+    """Сериализованный справочник с версией, которая растёт при изменениях"""
+
+    def __init__(self, name, queryset, serializer_class):
+        self.version_key = f'catalog:{name}:version'
+        self.queryset = queryset
+        self.serializer_class = serializer_class
+        self._cached = None
+        self._lock = Lock()
+
+    def version(self):
+        return cache.get_or_set(self.version_key, 0, None)
+
+    def bump(self, **kwargs):
+        try:
+            cache.incr(self.version_key)
+        except ValueError:
+            cache.set(self.version_key, 1, None)
+
+    def get(self):
+        version = self.version()
+        with self._lock:
+            if (self._cached is None or self._cached[0] != version
+                    or time.monotonic() - self._cached[1]
+                    > CATALOG_CACHE_TTL):
+                content = JSONRenderer().render(self.serializer_class(
+                    self.queryset.all(), many=True).data)
+                etag = '"{}"'.format(hashlib.sha1(content).hexdigest())
+                self._cached = (version, time.monotonic(), etag, content)
+            return self._cached[2:]
+
+    def response(self, request):
+        etag, content = self.get()
+        if_none_match = parse_etags(request.META.get('HTTP_IF_NONE_MATCH', ''))
+        if etag in if_none_match or '*' in if_none_match:
+            response = HttpResponseNotModified()
+        else:
+            response = HttpResponse(content, content_type='application/json')
+        response['ETag'] = etag
+        patch_cache_control(response, public=True, max_age=CATALOG_MAX_AGE)
+        return response
+
+
+tag_catalog = Catalog('tags', Tag.objects.all(), TagSerializer)
+ingredient_catalog = Catalog(
+    'ingredients', Ingredient.objects.order_by('name'), IngredientSerializer)
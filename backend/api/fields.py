@@ -0,0 +1,93 @@
+import base64
+import binascii
+from tempfile import SpooledTemporaryFile
+from uuid import uuid4
+
+from django.core.files.uploadedfile import UploadedFile
+from PIL import Image
+from rest_framework import serializers
+
+from recipes.constants import (IMAGE_DECODE_CHUNK_SIZE, IMAGE_SPOOL_SIZE,
+                               MAX_IMAGE_PIXELS, MAX_IMAGE_SIDE)
+
+BASE64_PREFIX = ';base64,'
+IMAGE_FORMATS = {'JPEG': 'jpg', 'PNG': 'png', 'GIF': 'gif', 'WEBP': 'webp'}
+IMAGE_SIGNATURES = (b'\xff\xd8\xff', b'\x89PNG\r\n\x1a\n', b'GIF87a', b'GIF89a',
+                    b'RIFF')
+
+
+def iter_base64(data, start):
+    """Декодировать строку частями, не держа в памяти весь файл"""
+    carry = b''
+    for position in range(start, len(data), IMAGE_DECODE_CHUNK_SIZE):
+        chunk = carry + data[
+            position:position + IMAGE_DECODE_CHUNK_SIZE
+        ].encode('ascii').translate(None, b' \t\r\n')
+        usable = len(chunk) // 4 * 4
+        yield base64.b64decode(chunk[:usable], validate=True)
+        carry = chunk[usable:]
+    if carry:
+        raise binascii.Error('Incorrect padding')
+
+
+class Base64ImageField(serializers.ImageField):
+    """Картинка в base64, проверяется по заголовку до полного декодирования"""
+    default_error_messages = {
+        'invalid': 'Загрузите картинку в кодировке base64.',
+        'invalid_image': 'Файл повреждён или не является картинкой.',
+        'format': 'Допустимые форматы: {formats}.',
+        'too_big': 'Картинка больше {side}x{side} пикселей '
+                   'или {pixels} пикселей всего.',
+    }
+
+    def to_internal_value(self, data):
+        if data in ('', None):
+            return None
+        if not isinstance(data, str):
+            self.fail('invalid')
+        start = data.find(BASE64_PREFIX, 0, 100)
+        start = 0 if start == -1 else start + len(BASE64_PREFIX)
+        file = SpooledTemporaryFile(max_size=IMAGE_SPOOL_SIZE)
+        try:
+            size = self.decode(data, start, file)
+            image_format = self.check_image(file)
+        except Exception:
+            file.close()
+            raise
+        file.seek(0)
+        return UploadedFile(
+            file, name=f'{uuid4().hex}.{IMAGE_FORMATS[image_format]}',
+            content_type=Image.MIME[image_format], size=size)
+
+    def decode(self, data, start, file):
+        size = 0
+        try:
+            for chunk in iter_base64(data, start):
+                if not size and not chunk.startswith(IMAGE_SIGNATURES):
+                    self.fail('format',
+                              formats=', '.join(IMAGE_FORMATS.values()))
+                file.write(chunk)
+                size += len(chunk)
+        except (binascii.Error, UnicodeEncodeError):
+            self.fail('invalid')
+        return size
+
+    def check_image(self, file):
+        file.seek(0)
+        try:
+            image = Image.open(file)
+        except Image.DecompressionBombError:
+            self.fail('too_big', side=MAX_IMAGE_SIDE, pixels=MAX_IMAGE_PIXELS)
+        except OSError:
+            self.fail('invalid_image')
+        if image.format not in IMAGE_FORMATS:
+            self.fail('format', formats=', '.join(IMAGE_FORMATS.values()))
+        width, height = image.size
+        if (max(width, height) > MAX_IMAGE_SIDE
+                or width * height > MAX_IMAGE_PIXELS):
+            self.fail('too_big', side=MAX_IMAGE_SIDE, pixels=MAX_IMAGE_PIXELS)
+        try:
+            image.verify()
+        except Exception:
+            self.fail('invalid_image')
+        return image.format
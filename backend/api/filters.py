@@ -1,6 +1,16 @@
+import hashlib
+import json
+
+from django.core.cache import cache
+from django.db.models import Count, Exists, OuterRef
 from django_filters.rest_framework import filters, FilterSet
 
-from recipes.models import Recipe, Tag
+from recipes.constants import FACETS_CACHE_TTL
+from recipes.models import Favorite, Recipe, ShoppingCart, Tag
+from recipes.search import SearchMatch, SearchRank, search_words
+
+FACET_PARAMS = ('author', 'is_favorited', 'is_in_shopping_cart', 'search')
+PERSONAL_PARAMS = ('is_favorited', 'is_in_shopping_cart')
 
 
 class RecipeFilter(FilterSet):
@@ -9,20 +19,67 @@ class RecipeFilter(FilterSet):
         method='get_is_in_shopping_cart')
     tags = filters.ModelMultipleChoiceFilter(queryset=Tag.objects.all(),
                                              field_name='tags__slug',
-                                             to_field_name='slug')
+                                             to_field_name='slug',
+                                             method='get_tags')
+    search = filters.CharFilter(method='get_search')
 
     class Meta:
-        fields = ('is_favorited', 'is_in_shopping_cart', 'tags', 'author')
+        fields = ('is_favorited', 'is_in_shopping_cart', 'tags', 'author',
+                  'search')
         model = Recipe
 
+    def get_tags(self, queryset, name, value):
+        if not value:
+            return queryset
+        return queryset.filter(Exists(Recipe.tags.through.objects.filter(
+            recipe=OuterRef('pk'), tag__in=value
+        )))
+
+    def get_search(self, queryset, name, value):
+        if not search_words(value):
+            return queryset
+        return queryset.filter(SearchMatch(value)).annotate(
+            search_rank=SearchRank(value)
+        ).order_by('-search_rank', '-pub_date', '-id')
+
     def get_is_favorited(self, queryset, name, value):
         user = self.request.user
         if user.is_authenticated and value:
-            return queryset.filter(favorite__user=user)
+            return queryset.filter(Exists(Favorite.objects.filter(
+                user=user, recipe=OuterRef('pk')
+            )))
         return queryset
 
     def get_is_in_shopping_cart(self, queryset, name, value):
         user = self.request.user
         if user.is_authenticated and value:
-            return queryset.filter(shopping_recipe__user=user)
+            return queryset.filter(Exists(ShoppingCart.objects.filter(
+                user=user, recipe=OuterRef('pk')
+            )))
         return queryset
+
+
+def tag_facets(request):
+    """Число рецептов по тегам при текущих фильтрах, кроме самих тегов"""
+    params = {
+        name: request.query_params[name]
+        for name in FACET_PARAMS if name in request.query_params
+    }
+    user_id = None
+    if request.user.is_authenticated and params.keys() & PERSONAL_PARAMS:
+        user_id = request.user.id
+    signature = json.dumps([sorted(params.items()), user_id])
+    key = 'recipe_facets:' + hashlib.md5(signature.encode()).hexdigest()
+    facets = cache.get(key)
+    if facets is None:
+        recipes = RecipeFilter(params, queryset=Recipe.objects.all(),
+                               request=request).qs
+        facets = dict(
+            Recipe.tags.through.objects.filter(
+                recipe__in=recipes.order_by().values('pk')
+            ).values_list('tag__slug').annotate(
+                Count('recipe')
+            ).order_by()
+        )
+        cache.set(key, facets, FACETS_CACHE_TTL)
+    return facets
@@ -0,0 +1,165 @@
+import base64
+import io
+import json
+from pathlib import Path
+from statistics import quantiles
+from time import perf_counter
+from urllib.parse import quote
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.db.models import Count
+from django.test.utils import CaptureQueriesContext
+from PIL import Image
+from rest_framework.test import APIClient
+
+from recipes.models import Ingredient, Recipe, Tag
+from users.models import User
+
+
+class Rollback(Exception):
+    """Откат транзакции после замера записи"""
+
+
+def png_base64():
+    buffer = io.BytesIO()
+    Image.new('RGB', (64, 64), '#FFAA00').save(buffer, 'PNG')
+    return 'data:image/png;base64,' + base64.b64encode(
+        buffer.getvalue()).decode()
+
+
+class Command(BaseCommand):
+    """Замер задержки и числа SQL-запросов основных эндпоинтов API"""
+
+    def add_arguments(self, parser):
+        parser.add_argument('--repeat', type=int, default=30)
+        parser.add_argument('--limit', type=int, default=6)
+        parser.add_argument('--baseline', type=Path,
+                            help='JSON с результатами прошлого замера')
+        parser.add_argument('--save-baseline', action='store_true',
+                            help='Записать результаты в --baseline')
+        parser.add_argument('--tolerance', type=float, default=0.25,
+                            help='Допустимый рост p95 относительно baseline')
+
+    def get_client(self):
+        user = User.objects.annotate(
+            cart=Count('shopping_recipe')).order_by('-cart').first()
+        if user is None or not Recipe.objects.exists():
+            raise CommandError('Нет данных, запустите generate_data')
+        client = APIClient(SERVER_NAME='localhost')
+        client.force_authenticate(user)
+        return client, user
+
+    def scenarios(self, user):
+        recipe = Recipe.objects.order_by('-favorites_count').first()
+        limit = self.options['limit']
+        tags = list(Tag.objects.values_list('slug', flat=True)[:2])
+        tags_query = '&'.join(f'tags={slug}' for slug in tags)
+        payload = {
+            'ingredients': [
+                {'id': pk, 'amount': 10}
+                for pk in Ingredient.objects.values_list('id', flat=True)[:10]
+            ],
+            'tags': list(Tag.objects.values_list('id', flat=True)[:2]),
+            'image': png_base64(),
+            'name': 'Замер',
+            'text': 'Рецепт для замера',
+            'cooking_time': 10,
+        }
+        return {
+            'recipes_list': ('get', f'/api/recipes/?limit={limit}'),
+            'recipes_list_deep': (
+                'get', f'/api/recipes/?limit={limit}&page=100'),
+            'recipes_list_filtered': (
+                'get', f'/api/recipes/?limit={limit}&is_favorited=1'
+                       f'&tags={tags[0]}'),
+            'recipes_list_two_tags': (
+                'get', f'/api/recipes/?limit={limit}&{tags_query}'),
+            'recipes_list_all_filters': (
+                'get', f'/api/recipes/?limit={limit}&{tags_query}'
+                       '&is_favorited=1&is_in_shopping_cart=1'),
+            'recipes_list_tags_deep': (
+                'get', f'/api/recipes/?limit={limit}&page=100&{tags_query}'),
+            'recipes_search': (
+                'get', f'/api/recipes/?limit={limit}'
+                       f'&search={quote(recipe.name.split()[0])}'),
+            'recipes_retrieve': ('get', f'/api/recipes/{recipe.id}/'),
+            'subscriptions': (
+                'get', f'/api/users/subscriptions/?limit={limit}'
+                       '&recipes_limit=3'),
+            'download_shopping_cart': (
+                'get', '/api/recipes/download_shopping_cart/'),
+            'recipes_create': ('post', '/api/recipes/', payload),
+        }
+
+    def call(self, client, method, url, payload=None):
+        if method == 'get':
+            response = client.get(url)
+            if response.streaming:
+                b''.join(response.streaming_content)
+            return response
+        try:
+            with transaction.atomic():
+                response = client.post(url, payload, format='json')
+                if response.status_code == 201:
+                    Recipe.objects.get(
+                        pk=response.data['id']).image.delete(save=False)
+                raise Rollback
+        except Rollback:
+            return response
+
+    def measure(self, client, method, url, payload=None):
+        timings = []
+        queries = 0
+        for _ in range(self.options['repeat']):
+            with CaptureQueriesContext(connection) as context:
+                start = perf_counter()
+                response = self.call(client, method, url, payload)
+                timings.append((perf_counter() - start) * 1e3)
+            if response.status_code >= 400:
+                raise CommandError(f'{url}: {response.status_code}')
+            queries = max(queries, len(context))
+        cut_points = quantiles(timings, n=100)
+        return {'p50': round(cut_points[49], 2),
+                'p95': round(cut_points[94], 2),
+                'p99': round(cut_points[98], 2),
+                'queries': queries}
+
+    def handle(self, *args, **options):
+        self.options = options
+        if options['repeat'] < 2:
+            raise CommandError('--repeat должен быть не меньше 2')
+        client, user = self.get_client()
+        results = {}
+        for name, (method, url, *payload) in self.scenarios(user).items():
+            results[name] = self.measure(client, method, url, *payload)
+            self.stdout.write(
+                f'{name:>24}: p50 {results[name]["p50"]:8.2f} мс, '
+                f'p95 {results[name]["p95"]:8.2f} мс, '
+                f'p99 {results[name]["p99"]:8.2f} мс, '
+                f'запросов {results[name]["queries"]}')
+        baseline_path = options['baseline']
+        if baseline_path and options['save_baseline']:
+            baseline_path.write_text(json.dumps(results, indent=2))
+            self.stdout.write(f'Baseline записан в {baseline_path}')
+        elif baseline_path:
+            self.compare(json.loads(baseline_path.read_text()), results)
+
+    def compare(self, baseline, results):
+        regressions = []
+        for name, result in results.items():
+            expected = baseline.get(name)
+            if expected is None:
+                continue
+            if result['queries'] > expected['queries']:
+                regressions.append(
+                    f'{name}: запросов {result["queries"]} '
+                    f'вместо {expected["queries"]}')
+            limit = expected['p95'] * (1 + self.options['tolerance'])
+            if result['p95'] > limit:
+                regressions.append(
+                    f'{name}: p95 {result["p95"]} мс, '
+                    f'допустимо {limit:.2f} мс')
+        if regressions:
+            raise CommandError('Регрессии:\n' + '\n'.join(regressions))
+        self.stdout.write(self.style.SUCCESS('Регрессий нет'))
@@ -0,0 +1,57 @@
+import base64
+import io
+import os
+import tracemalloc
+
+from django.core.management.base import BaseCommand, CommandError
+from PIL import Image
+
+from api.fields import Base64ImageField
+from recipes.constants import IMAGE_DECODE_CHUNK_SIZE, IMAGE_SPOOL_SIZE
+
+MEGABYTE = 1024 * 1024
+
+
+def noise_base64(size):
+    """PNG из шума, который почти не сжимается"""
+    side = int((size / 3) ** 0.5)
+    image = Image.frombytes('RGB', (side, side), os.urandom(side * side * 3))
+    buffer = io.BytesIO()
+    image.save(buffer, 'PNG', compress_level=1)
+    return 'data:image/png;base64,' + base64.b64encode(
+        buffer.getvalue()).decode()
+
+
+class Command(BaseCommand):
+    """Пиковая память при разборе картинки в base64"""
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', type=float, nargs='+',
+                            default=(1, 3, 6),
+                            help='Размеры картинок в мегабайтах')
+        parser.add_argument('--limit', type=float,
+                            help='Допустимый пик памяти в мегабайтах')
+
+    def handle(self, *args, **options):
+        limit = options['limit'] or (
+            2 * IMAGE_SPOOL_SIZE + 4 * IMAGE_DECODE_CHUNK_SIZE) / MEGABYTE
+        field = Base64ImageField()
+        failed = []
+        for size in options['sizes']:
+            payload = noise_base64(size * MEGABYTE)
+            tracemalloc.start()
+            uploaded = field.run_validation(payload)
+            peak = tracemalloc.get_traced_memory()[1] / MEGABYTE
+            tracemalloc.stop()
+            uploaded.close()
+            self.stdout.write(
+                f'картинка {uploaded.size / MEGABYTE:6.2f} МБ, '
+                f'base64 {len(payload) / MEGABYTE:6.2f} МБ: '
+                f'пик {peak:6.2f} МБ')
+            if peak > limit:
+                failed.append(size)
+        if failed:
+            raise CommandError(
+                f'Пик памяти больше {limit:.2f} МБ для размеров: {failed}')
+        self.stdout.write(self.style.SUCCESS(
+            f'Пик памяти не превышает {limit:.2f} МБ'))
@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+
+from api.response_cache import recipe_cache
+
+
+class Command(BaseCommand):
+    """Попадания и промахи кэша ответов для анонимов"""
+
+    def add_arguments(self, parser):
+        parser.add_argument('--reset', action='store_true')
+
+    def handle(self, *args, **options):
+        stats = recipe_cache.stats()
+        total = stats['hits'] + stats['misses']
+        ratio = stats['hits'] / total if total else 0
+        self.stdout.write(f'Попаданий: {stats["hits"]}, '
+                          f'промахов: {stats["misses"]}, '
+                          f'доля попаданий: {ratio:.1%}')
+        if options['reset']:
+            recipe_cache.reset_stats()
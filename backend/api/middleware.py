@@ -0,0 +1,145 @@
+import logging
+from functools import partial
+from time import perf_counter
+
+from django.conf import settings
+from django.db import connections
+
+from .slow_queries import schedule_record
+
+logger = logging.getLogger('api.budget')
+
+
+class QueryStats:
+    """Обёртка execute: считает запросы и время, проведённое в базе"""
+
+    def __init__(self, slow_threshold=None):
+        self.count = 0
+        self.duration = 0.0
+        self.slow_threshold = slow_threshold
+        self.slow = []
+
+    def __call__(self, execute, sql, params, many, context):
+        start = perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            duration = perf_counter() - start
+            self.duration += duration
+            self.count += 1
+            if (self.slow_threshold is not None and not many
+                    and duration > self.slow_threshold):
+                self.slow.append((sql, params, duration))
+
+
+def get_budget(resolver_match, method):
+    """Бюджет маршрута и метода из QUERY_BUDGETS, иначе по умолчанию.
+
+    Ключи - пары (имя маршрута, метод), HEAD проверяется как GET.
+    """
+    budgets = getattr(settings, 'QUERY_BUDGETS', {})
+    name = resolver_match and (resolver_match.url_name
+                               or resolver_match.route)
+    method = 'GET' if method == 'HEAD' else method
+    return name, budgets.get((name, method)) or budgets.get('default')
+
+
+def timed_representation(request, to_representation, instance):
+    """to_representation с учётом времени сериализации запроса"""
+    stats = getattr(request, 'query_stats', None)
+    if stats is None:
+        return to_representation(instance)
+    db_duration = stats.duration
+    start = perf_counter()
+    try:
+        return to_representation(instance)
+    finally:
+        request.serialize_duration += (
+            perf_counter() - start - (stats.duration - db_duration))
+
+
+class SerializationTimingMixin:
+    """Примесь к вьюсету: время сериализации в Server-Timing отдельно"""
+
+    def get_serializer(self, *args, **kwargs):
+        serializer = super().get_serializer(*args, **kwargs)
+        serializer.to_representation = partial(
+            timed_representation, self.request._request,
+            serializer.to_representation)
+        return serializer
+
+
+class QueryBudgetMiddleware:
+    """Заголовок Server-Timing и журнал запросов сверх бюджета.
+
+    Учитываются только пути из QUERY_BUDGET_PATHS: админка, статика и
+    медиа проходят мимо без обёртки execute. Запросы потокового ответа
+    выполняются уже после выхода из вьюхи, поэтому бюджет проверяется,
+    когда поток отдан целиком, а заголовок описывает только время до
+    начала отдачи.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if not request.path_info.startswith(
+                tuple(settings.QUERY_BUDGET_PATHS)):
+            return self.get_response(request)
+        threshold = settings.SLOW_QUERY_THRESHOLD_MS
+        stats = QueryStats(threshold and threshold / 1e3)
+        request.query_stats = stats
+        request.render_duration = 0.0
+        request.serialize_duration = 0.0
+        request.view_action = None
+        start = perf_counter()
+        with connections['default'].execute_wrapper(stats):
+            response = self.get_response(request)
+        total = perf_counter() - start
+        app = (total - stats.duration - request.render_duration
+               - request.serialize_duration)
+        response['Server-Timing'] = ', '.join((
+            f'db;dur={stats.duration * 1e3:.1f};'
+            f'desc="{stats.count} queries"',
+            f'app;dur={app * 1e3:.1f}',
+            f'serialize;dur={request.serialize_duration * 1e3:.1f}',
+            f'render;dur={request.render_duration * 1e3:.1f}',
+            f'total;dur={total * 1e3:.1f}',
+        ))
+        if response.streaming:
+            response.streaming_content = self.stream(
+                response.streaming_content, request, stats, start)
+        else:
+            self.check(request, stats, perf_counter() - start)
+        return response
+
+    def stream(self, content, request, stats, start):
+        try:
+            with connections['default'].execute_wrapper(stats):
+                yield from content
+        finally:
+            self.check(request, stats, perf_counter() - start)
+
+    def check(self, request, stats, total):
+        name, budget = get_budget(request.resolver_match, request.method)
+        if budget and (stats.count > budget['queries']
+                       or total * 1e3 > budget['time_ms']):
+            logger.warning(
+                'Превышен бюджет %s %s (%s): %d запросов, %.1f мс',
+                request.method, request.get_full_path(), name,
+                stats.count, total * 1e3)
+        if stats.slow:
+            schedule_record(stats.slow, name, request.view_action)
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        actions = getattr(view_func, 'actions', None) or {}
+        request.view_action = actions.get(request.method.lower())
+
+    def process_template_response(self, request, response):
+        start = perf_counter()
+
+        def finish(response):
+            request.render_duration = perf_counter() - start
+
+        response.add_post_render_callback(finish)
+        return response
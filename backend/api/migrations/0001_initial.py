@@ -0,0 +1,35 @@
+# Generated by Django 3.2.25 on 2026-10-18 16:49
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SlowQuery',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('fingerprint', models.CharField(max_length=40, unique=True, verbose_name='Отпечаток')),
+                ('sql', models.TextField(verbose_name='Пример запроса')),
+                ('view', models.CharField(blank=True, max_length=200, verbose_name='Маршрут')),
+                ('action', models.CharField(blank=True, max_length=50, verbose_name='Действие')),
+                ('count', models.PositiveIntegerField(default=1, verbose_name='Количество')),
+                ('total_ms', models.FloatField(verbose_name='Суммарное время, мс')),
+                ('max_ms', models.FloatField(verbose_name='Максимальное время, мс')),
+                ('plan', models.TextField(blank=True, verbose_name='План выполнения')),
+                ('first_seen', models.DateTimeField(auto_now_add=True, verbose_name='Впервые')),
+                ('last_seen', models.DateTimeField(auto_now=True, verbose_name='Последний раз')),
+            ],
+            options={
+                'verbose_name': 'Медленный запрос',
+                'verbose_name_plural': 'Медленные запросы',
+                'ordering': ('-max_ms',),
+            },
+        ),
+    ]
@@ -0,0 +1,53 @@
+from django.db import models
+
+
+class SlowQuery(models.Model):
+    """Медленный запрос, сгруппированный по нормализованному отпечатку"""
+    fingerprint = models.CharField(
+        max_length=40,
+        unique=True,
+        verbose_name='Отпечаток'
+    )
+    sql = models.TextField(
+        verbose_name='Пример запроса'
+    )
+    view = models.CharField(
+        max_length=200,
+        blank=True,
+        verbose_name='Маршрут'
+    )
+    action = models.CharField(
+        max_length=50,
+        blank=True,
+        verbose_name='Действие'
+    )
+    count = models.PositiveIntegerField(
+        default=1,
+        verbose_name='Количество'
+    )
+    total_ms = models.FloatField(
+        verbose_name='Суммарное время, мс'
+    )
+    max_ms = models.FloatField(
+        verbose_name='Максимальное время, мс'
+    )
+    plan = models.TextField(
+        blank=True,
+        verbose_name='План выполнения'
+    )
+    first_seen = models.DateTimeField(
+        auto_now_add=True,
+        verbose_name='Впервые'
+    )
+    last_seen = models.DateTimeField(
+        auto_now=True,
+        verbose_name='Последний раз'
+    )
+
+    class Meta:
+        ordering = ('-max_ms',)
+        verbose_name = 'Медленный запрос'
+        verbose_name_plural = 'Медленные запросы'
+
+    def __str__(self):
+        return f'{self.view} {self.action} {self.max_ms:.1f} мс'
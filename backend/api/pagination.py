@@ -1,6 +1,157 @@
+import binascii
+from base64 import b64decode, b64encode
+from collections import OrderedDict
+from datetime import datetime
+
 from rest_framework import pagination
+from rest_framework.exceptions import NotFound, ValidationError
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+from recipes.constants import MAX_PAGE_SIZE
+from recipes.feed import after
+from recipes.search import search_words
 
 
 class CustomPagination(pagination.PageNumberPagination):
     page_size_query_param = 'limit'
     page_size = 6
+
+
+class KeysetPagination(pagination.BasePagination):
+    """Курсор - направление и ключ (pub_date, id) крайнего рецепта страницы.
+
+    Условие (pub_date, id) < ключа курсора идёт по индексу
+    (-pub_date, -id), поэтому страницы не зависят от OFFSET и равных дат.
+    """
+    cursor_query_param = 'cursor'
+    page_size_query_param = 'limit'
+    page_size = 6
+    max_page_size = MAX_PAGE_SIZE
+    invalid_cursor_message = 'Неверный курсор'
+
+    def get_page_size(self, request):
+        try:
+            limit = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        if limit <= 0:
+            return self.page_size
+        return min(limit, self.max_page_size)
+
+    def decode_cursor(self, request):
+        """(назад ли, ключ) или (False, None) для первой страницы"""
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return False, None
+        try:
+            direction, pub_date, recipe_id = b64decode(
+                encoded.encode(), validate=True).decode().split(' ')
+            pub_date = datetime.fromisoformat(pub_date)
+            if direction not in 'np' or pub_date.tzinfo is None:
+                raise ValueError
+            return direction == 'p', (pub_date, int(recipe_id))
+        except (TypeError, ValueError, UnicodeDecodeError, binascii.Error):
+            raise NotFound(self.invalid_cursor_message)
+
+    def encode_cursor(self, position, reverse=False):
+        pub_date, recipe_id = position
+        return b64encode('{} {} {}'.format(
+            'p' if reverse else 'n', pub_date.isoformat(), recipe_id
+        ).encode()).decode()
+
+    def get_link(self, position, reverse=False):
+        if position is None:
+            return None
+        return replace_query_param(
+            self.base_url, self.cursor_query_param,
+            self.encode_cursor(position, reverse))
+
+    def get_paginated_response(self, data):
+        return Response(OrderedDict([
+            ('next', self.get_link(self.next_position)),
+            ('previous', self.get_link(self.previous_position, True)),
+            ('results', data),
+        ]))
+
+
+class RecipeCursorPagination(KeysetPagination):
+    """Постраничный вывод по ключу (-pub_date, -id) без COUNT и OFFSET.
+
+    Поиск упорядочен по релевантности, а не по ключу курсора, поэтому
+    вместе с курсором он отклоняется, как и другая сортировка.
+    """
+    ordering_query_param = 'ordering'
+    search_query_param = 'search'
+    invalid_ordering_message = 'С курсором доступна только сортировка -pub_date'
+    invalid_search_message = ('Поиск сортирует по релевантности и доступен '
+                              'только с номерами страниц')
+
+    def paginate_queryset(self, queryset, request, view=None):
+        if request.query_params.get(
+                self.ordering_query_param) not in (None, '', '-pub_date'):
+            raise ValidationError(
+                {self.ordering_query_param: self.invalid_ordering_message})
+        if search_words(request.query_params.get(
+                self.search_query_param, '')):
+            raise ValidationError(
+                {self.search_query_param: self.invalid_search_message})
+        self.base_url = request.build_absolute_uri()
+        limit = self.get_page_size(request)
+        reverse, position = self.decode_cursor(request)
+        if position is not None:
+            queryset = queryset.filter(
+                after(position, 'pub_date', 'id', newer=reverse))
+        ordering = ('pub_date', 'id') if reverse else ('-pub_date', '-id')
+        recipes = list(queryset.order_by(*ordering)[:limit + 1])
+        has_more = len(recipes) > limit
+        recipes = recipes[:limit]
+        if reverse:
+            recipes.reverse()
+        keys = [(recipe.pub_date, recipe.id) for recipe in recipes]
+        first, last = (keys[0], keys[-1]) if keys else (position, position)
+        if reverse:
+            self.previous_position = first if has_more else None
+            self.next_position = last
+        else:
+            self.previous_position = first if position is not None else None
+            self.next_position = last if has_more else None
+        return recipes
+
+
+class RecipePagination(CustomPagination):
+    """Номера страниц по умолчанию, курсор при наличии параметра cursor"""
+    cursor_query_param = RecipeCursorPagination.cursor_query_param
+    max_page_size = MAX_PAGE_SIZE
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.cursor_paginator = None
+        if self.cursor_query_param in request.query_params:
+            self.cursor_paginator = RecipeCursorPagination()
+            return self.cursor_paginator.paginate_queryset(
+                queryset, request, view)
+        return super().paginate_queryset(queryset, request, view)
+
+    def get_paginated_response(self, data):
+        if self.cursor_paginator is not None:
+            return self.cursor_paginator.get_paginated_response(data)
+        return super().get_paginated_response(data)
+
+
+class FeedPagination(KeysetPagination):
+    """Курсор ленты, только вперёд.
+
+    Страницу отдаёт функция feed(position, limit), которая возвращает
+    пары (pub_date, id) по убыванию строго после position.
+    """
+
+    def paginate_queryset(self, feed, request, view=None):
+        self.base_url = request.build_absolute_uri()
+        limit = self.get_page_size(request)
+        reverse, position = self.decode_cursor(request)
+        if reverse:
+            raise NotFound(self.invalid_cursor_message)
+        keys = feed(position, limit + 1)
+        self.next_position = keys[limit - 1] if len(keys) > limit else None
+        self.previous_position = None
+        return [recipe_id for pub_date, recipe_id in keys[:limit]]
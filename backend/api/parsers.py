@@ -0,0 +1,35 @@
+import io
+
+from rest_framework import status
+from rest_framework.exceptions import APIException
+from rest_framework.parsers import JSONParser
+
+from recipes.constants import MAX_RECIPE_BODY_SIZE
+
+
+class RequestTooLarge(APIException):
+    status_code = status.HTTP_413_REQUEST_ENTITY_TOO_LARGE
+    default_detail = 'Слишком большой запрос.'
+    default_code = 'request_too_large'
+
+
+class LimitedJSONParser(JSONParser):
+    """JSON не больше max_size байт.
+
+    Заявленный CONTENT_LENGTH проверяется до чтения тела, а само тело
+    читается не дальше max_size + 1 байт: у запросов без длины или с
+    chunked-кодированием заголовку верить нельзя.
+    """
+    max_size = MAX_RECIPE_BODY_SIZE
+
+    def too_large(self):
+        return RequestTooLarge(f'Размер запроса больше {self.max_size} байт.')
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        request = parser_context['request']
+        if int(request.META.get('CONTENT_LENGTH') or 0) > self.max_size:
+            raise self.too_large()
+        body = stream.read(self.max_size + 1)
+        if len(body) > self.max_size:
+            raise self.too_large()
+        return super().parse(io.BytesIO(body), media_type, parser_context)
@@ -0,0 +1,111 @@
+"""Общий кэш ответов для анонимных пользователей"""
+import hashlib
+import json
+import time
+
+from django.core.cache import cache
+from django.db import transaction
+from rest_framework import status
+from rest_framework.response import Response
+
+from recipes.constants import RESPONSE_CACHE_TTL
+
+
+class ResponseCache:
+    """Ответы по нормализованным параметрам запроса.
+
+    Ключ включает поколения данных, от которых зависит ответ: запись
+    увеличивает поколение, и старые ответы просто перестают читаться.
+    """
+
+    def __init__(self, prefix, timeout):
+        self.prefix = prefix
+        self.timeout = timeout
+
+    def generation_key(self, name):
+        return f'{self.prefix}:generation:{name}'
+
+    def generations(self, names):
+        keys = [self.generation_key(name) for name in names]
+        found = cache.get_many(keys)
+        missing = {key: time.time_ns() for key in keys if key not in found}
+        if missing:
+            cache.set_many(missing, None)
+            found.update(missing)
+        return [found[key] for key in keys]
+
+    def bump_now(self, names):
+        for name in names:
+            key = self.generation_key(name)
+            try:
+                cache.incr(key)
+            except ValueError:
+                cache.set(key, time.time_ns(), None)
+
+    def bump(self, *names):
+        """Сменить поколения после фиксации транзакции"""
+        transaction.on_commit(lambda: self.bump_now(names))
+
+    def key(self, request, names):
+        params = sorted(
+            (name, sorted(values))
+            for name, values in request.query_params.lists()
+        )
+        signature = json.dumps([
+            request.build_absolute_uri(request.path), params,
+            self.generations(names),
+        ])
+        return '{}:response:{}'.format(
+            self.prefix, hashlib.md5(signature.encode()).hexdigest())
+
+    def count(self, name):
+        key = f'{self.prefix}:stats:{name}'
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.set(key, 1, None)
+
+    def stats(self):
+        names = ('hits', 'misses')
+        values = cache.get_many(
+            [f'{self.prefix}:stats:{name}' for name in names])
+        return {name: values.get(f'{self.prefix}:stats:{name}', 0)
+                for name in names}
+
+    def reset_stats(self):
+        cache.delete_many(
+            [f'{self.prefix}:stats:{name}' for name in ('hits', 'misses')])
+
+    def respond(self, request, names, build):
+        """Ответ из кэша для анонима или build() с сохранением результата"""
+        if request.user.is_authenticated:
+            return build()
+        key = self.key(request, names)
+        data = cache.get(key)
+        if data is not None:
+            self.count('hits')
+            response = Response(data)
+            response['X-Cache'] = 'HIT'
+            return response
+        self.count('misses')
+        response = build()
+        if response.status_code == status.HTTP_200_OK:
+            cache.set(key, response.data, self.timeout)
+        response['X-Cache'] = 'MISS'
+        return response
+
+
+recipe_cache = ResponseCache('recipes', RESPONSE_CACHE_TTL)
+
+
+def recipe_generation(recipe_id):
+    return f'recipe:{recipe_id}'
+
+
+def author_generation(author_id):
+    return f'author:{author_id}'
+
+
+def invalidate_recipes(recipe_ids):
+    recipe_cache.bump(
+        'list', *(recipe_generation(pk) for pk in recipe_ids))
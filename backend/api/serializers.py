@@ -1,13 +1,17 @@
 import re
+from django.db import transaction
+from django.db.models import prefetch_related_objects
 from rest_framework import serializers, status
-from drf_extra_fields.fields import Base64ImageField
 from rest_framework.exceptions import ValidationError
 
+from recipes import composition
+from recipes.images import rendition_urls, schedule_renditions
 from recipes.models import (Tag, Recipe,
                             RecipeIngredient, Ingredient,
                             Favorite, ShoppingCart)
 from users.serializers import CustomUserSerializer
 from users.models import User, Subscribe
+from .fields import Base64ImageField
 
 
 class IngredientSerializer(serializers.ModelSerializer):
@@ -24,13 +28,30 @@ class TagSerializer(serializers.ModelSerializer):
         model = Tag
 
 
+class RenditionsField(serializers.Field):
+    """Ссылки на уменьшенные копии картинки"""
+    def __init__(self, **kwargs):
+        kwargs['source'] = '*'
+        kwargs['read_only'] = True
+        super().__init__(**kwargs)
+
+    def to_representation(self, recipe):
+        urls = rendition_urls(recipe)
+        request = self.context.get('request')
+        if urls is None or request is None:
+            return urls
+        return {rendition: request.build_absolute_uri(url)
+                for rendition, url in urls.items()}
+
+
 class ShortRecipeSerializer(serializers.ModelSerializer):
     """Краткое отображение рецепта"""
     name = serializers.ReadOnlyField()
     cooking_time = serializers.ReadOnlyField()
+    renditions = RenditionsField()
 
     class Meta:
-        fields = ('id', 'name', 'image', 'cooking_time')
+        fields = ('id', 'name', 'image', 'renditions', 'cooking_time')
         model = Recipe
 
 
@@ -55,34 +76,36 @@ class RecipeSerializer(serializers.ModelSerializer):
     author = CustomUserSerializer(read_only=True)
     is_favorited = serializers.SerializerMethodField(read_only=True)
     is_in_shopping_cart = serializers.SerializerMethodField(read_only=True)
+    renditions = RenditionsField()
 
     class Meta:
         fields = ('id', 'tags', 'author', 'ingredients', 'is_favorited',
-                  'is_in_shopping_cart', 'image', 'name', 'text',
-                  'cooking_time')
+                  'is_in_shopping_cart', 'image', 'renditions', 'name',
+                  'text', 'cooking_time')
         model = Recipe
 
     def get_is_favorited(self, obj):
+        if hasattr(obj, 'is_favorited'):
+            return obj.is_favorited
         request = self.context.get('request')
-        return (request and request.user.is_authenticated
-                and Favorite.objects.filter(
-                    user=request.user, recipe=obj
-                ).exists())
+        return bool(request and request.user.is_authenticated
+                    and Favorite.objects.filter(
+                        user=request.user, recipe=obj
+                    ).exists())
 
     def get_is_in_shopping_cart(self, obj):
+        if hasattr(obj, 'is_in_shopping_cart'):
+            return obj.is_in_shopping_cart
         request = self.context.get('request')
-        return (request and request.user.is_authenticated
-                and ShoppingCart.objects.filter(
-                    user=request.user, recipe=obj
-                ).exists())
+        return bool(request and request.user.is_authenticated
+                    and ShoppingCart.objects.filter(
+                        user=request.user, recipe=obj
+                    ).exists())
 
 
 class RecipeIngredientCreateSerializer(serializers.ModelSerializer):
     """Создание ингредиентов в рецепте"""
-    id = serializers.PrimaryKeyRelatedField(
-        queryset=Ingredient.objects.all(),
-        source='ingredient'
-    )
+    id = serializers.IntegerField()
 
     class Meta:
         fields = ('id', 'amount')
@@ -92,10 +115,7 @@ class RecipeIngredientCreateSerializer(serializers.ModelSerializer):
 class RecipeCreateSerializer(serializers.ModelSerializer):
     """Создание рецепта"""
     ingredients = RecipeIngredientCreateSerializer(many=True)
-    tags = serializers.PrimaryKeyRelatedField(
-        queryset=Tag.objects.all(),
-        many=True
-    )
+    tags = serializers.ListField(child=serializers.IntegerField())
     image = Base64ImageField()
     cooking_time = serializers.IntegerField()
     author = CustomUserSerializer(read_only=True)
@@ -111,43 +131,58 @@ class RecipeCreateSerializer(serializers.ModelSerializer):
                 detail='Отсутствуют ингридиенты!',
                 code=status.HTTP_400_BAD_REQUEST
             )
-        ingredients = self.initial_data.get('ingredients')
-        ingredients_list = []
-        for ingredient in ingredients:
-            ingredient_id = ingredient['id']
-            if ingredient_id in ingredients_list:
-                raise serializers.ValidationError(
-                    detail='Ингредиенты должны быть уникальны',
-                    code=status.HTTP_400_BAD_REQUEST
-                )
-            ingredients_list.append(ingredient_id)
-            if int(ingredient.get('amount')) < 1:
-                raise serializers.ValidationError(
-                    detail='Количество не может быть меньше одного',
-                    code=status.HTTP_400_BAD_REQUEST
-                )
-        if data.get('cooking_time') <= 0:
+        if data.get('cooking_time', 1) <= 0:
             raise serializers.ValidationError(
                 detail='Время должно быть больше нуля',
                 code=status.HTTP_400_BAD_REQUEST
             )
         return data
 
+    def validate_ingredients(self, value):
+        if not value:
+            raise ValidationError(
+                detail='Отсутствуют ингридиенты!',
+                code=status.HTTP_400_BAD_REQUEST
+            )
+        ids = [ingredient_data['id'] for ingredient_data in value]
+        if len(set(ids)) != len(ids):
+            raise ValidationError(
+                detail='Ингредиенты должны быть уникальны',
+                code=status.HTTP_400_BAD_REQUEST
+            )
+        ingredients = Ingredient.objects.in_bulk(ids)
+        unknown = [pk for pk in ids if pk not in ingredients]
+        if unknown:
+            raise ValidationError(
+                detail='Несуществующие ингредиенты: '
+                f'{", ".join(map(str, unknown))}',
+                code=status.HTTP_400_BAD_REQUEST
+            )
+        return [
+            {'ingredient': ingredients[ingredient_data['id']],
+             'amount': ingredient_data['amount']}
+            for ingredient_data in value
+        ]
+
     def validate_tags(self, value):
         if not value:
             raise ValidationError(
                 detail='Нужно выбрать хотя бы один тег',
                 code=status.HTTP_400_BAD_REQUEST
             )
-        tags_list = []
-        for tag in value:
-            if tag in tags_list:
-                raise ValidationError(
-                    detail='Теги должны быть уникальными',
-                    code=status.HTTP_400_BAD_REQUEST
-                )
-            tags_list.append(tag)
-        return value
+        if len(set(value)) != len(value):
+            raise ValidationError(
+                detail='Теги должны быть уникальными',
+                code=status.HTTP_400_BAD_REQUEST
+            )
+        tags = Tag.objects.in_bulk(value)
+        unknown = [pk for pk in value if pk not in tags]
+        if unknown:
+            raise ValidationError(
+                detail=f'Несуществующие теги: {", ".join(map(str, unknown))}',
+                code=status.HTTP_400_BAD_REQUEST
+            )
+        return [tags[pk] for pk in value]
 
     def validate_name(self, value):
         if not re.search(r'^[a-zA-Zа-яА-ЯёЁ]+$', value):
@@ -159,35 +194,83 @@ class RecipeCreateSerializer(serializers.ModelSerializer):
 
     @staticmethod
     def create_ingredients(ingredients, recipe):
-        for ingredient_data in ingredients:
-            RecipeIngredient.objects.create(
+        RecipeIngredient.objects.bulk_create(
+            RecipeIngredient(
                 recipe=recipe,
                 ingredient=ingredient_data['ingredient'],
                 amount=ingredient_data['amount']
             )
+            for ingredient_data in ingredients
+        )
+
+    @classmethod
+    def update_ingredients(cls, ingredients, recipe):
+        amounts = {
+            ingredient_data['ingredient'].id: ingredient_data['amount']
+            for ingredient_data in ingredients
+        }
+        current = {
+            recipe_ingredient.ingredient_id: recipe_ingredient
+            for recipe_ingredient in recipe.recipeingredient_set.all()
+        }
+        removed = [ingredient_id for ingredient_id in current
+                   if ingredient_id not in amounts]
+        with composition.collect():
+            if removed:
+                RecipeIngredient.objects.filter(
+                    recipe=recipe, ingredient_id__in=removed
+                ).delete()
+            deltas = {}
+            changed = []
+            for ingredient_id, amount in amounts.items():
+                recipe_ingredient = current.get(ingredient_id)
+                if recipe_ingredient is None:
+                    deltas[ingredient_id] = amount
+                elif recipe_ingredient.amount != amount:
+                    deltas[ingredient_id] = amount - recipe_ingredient.amount
+                    recipe_ingredient.amount = amount
+                    changed.append(recipe_ingredient)
+            if changed:
+                RecipeIngredient.objects.bulk_update(changed, ['amount'])
+            cls.create_ingredients(
+                [ingredient_data for ingredient_data in ingredients
+                 if ingredient_data['ingredient'].id not in current],
+                recipe
+            )
+            # bulk_update и bulk_create не отправляют сигналы, удаление
+            # выше записало свои приращения через post_delete
+            composition.record(recipe.id, deltas)
 
+    @transaction.atomic
     def create(self, validated_data):
         ingredients = validated_data.pop('ingredients')
         tags = validated_data.pop('tags')
         recipe = Recipe.objects.create(**validated_data)
         recipe.tags.set(tags)
         self.create_ingredients(ingredients, recipe)
+        schedule_renditions(recipe.image.name)
         return recipe
 
+    @transaction.atomic
     def update(self, instance, validated_data):
-        ingredients = validated_data.pop('ingredients')
-        tags = validated_data.pop('tags')
+        ingredients = validated_data.pop('ingredients', None)
+        tags = validated_data.pop('tags', None)
+        if 'image' in validated_data:
+            instance.has_renditions = False
         instance = super().update(instance, validated_data)
-        instance.tags.clear()
-        instance.tags.set(tags)
-        instance.ingredients.clear()
-        self.create_ingredients(ingredients, instance)
-        instance.save()
+        if 'image' in validated_data:
+            schedule_renditions(instance.image.name)
+        if tags is not None:
+            instance.tags.set(tags)
+        if ingredients is not None:
+            self.update_ingredients(ingredients, instance)
         return instance
 
     def to_representation(self, instance):
         request = self.context.get('request')
         context = {'request': request}
+        prefetch_related_objects(
+            [instance], 'recipeingredient_set__ingredient', 'tags')
         return RecipeSerializer(
             instance,
             context=context
@@ -213,7 +296,7 @@ class SubscriptionsSerializer(CustomUserSerializer):
     """Подписки"""
     is_subscribed = serializers.SerializerMethodField()
     recipes = serializers.SerializerMethodField()
-    recipes_count = serializers.SerializerMethodField()
+    recipes_count = serializers.IntegerField(read_only=True)
 
     class Meta:
         fields = ('email', 'id', 'username', 'first_name', 'last_name',
@@ -222,25 +305,14 @@ class SubscriptionsSerializer(CustomUserSerializer):
 
     def get_recipes(self, obj):
         serializer = ShortRecipeSerializer(
-            obj.recipes.all(),
+            obj.limited_recipes,
             many=True,
             read_only=True)
         return serializer.data
 
-    def get_recipes_count(self, obj):
-        return obj.recipes.count()
-
 
-class SubscribeSerializer(CustomUserSerializer):
+class SubscribeSerializer(SubscriptionsSerializer):
     """Подписаться - отписаться"""
-    is_subscribed = serializers.SerializerMethodField()
-    recipes = serializers.SerializerMethodField()
-    recipes_count = serializers.SerializerMethodField()
-
-    class Meta:
-        fields = ('email', 'id', 'username', 'first_name', 'last_name',
-                  'is_subscribed', 'recipes', 'recipes_count')
-        model = User
 
     def validate(self, data):
         author = self.instance
@@ -257,16 +329,6 @@ class SubscribeSerializer(CustomUserSerializer):
             )
         return data
 
-    def get_recipes(self, obj):
-        serializer = ShortRecipeSerializer(
-            obj.recipes.all(),
-            many=True,
-            read_only=True)
-        return serializer.data
-
-    def get_recipes_count(self, obj):
-        return obj.recipes.count()
-
 
 class SchoppingCartSerializer(serializers.ModelSerializer):
     """Список покупок"""
@@ -0,0 +1,73 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from recipes.images import renditions_ready
+from recipes.models import (Favorite, Ingredient, Recipe, RecipeIngredient,
+                            ShoppingCart, Tag)
+from recipes.signals import AUTHOR_FIELDS, ingredients_loaded
+from users.models import User
+from .catalogs import ingredient_catalog, tag_catalog
+from .response_cache import (author_generation, invalidate_recipes,
+                             recipe_cache)
+
+for model, catalog in ((Tag, tag_catalog), (Ingredient, ingredient_catalog)):
+    post_save.connect(catalog.bump, sender=model, weak=False,
+                      dispatch_uid=f'{model.__name__}_catalog_save')
+    post_delete.connect(catalog.bump, sender=model, weak=False,
+                        dispatch_uid=f'{model.__name__}_catalog_delete')
+ingredients_loaded.connect(ingredient_catalog.bump, weak=False,
+                           dispatch_uid='Ingredient_catalog_loaded')
+
+
+@receiver(post_save, sender=Recipe, dispatch_uid='recipe_cache_recipe_save')
+@receiver(post_delete, sender=Recipe,
+          dispatch_uid='recipe_cache_recipe_delete')
+def invalidate_recipe(sender, instance, **kwargs):
+    invalidate_recipes([instance.pk])
+
+
+@receiver(post_save, sender=RecipeIngredient,
+          dispatch_uid='recipe_cache_ingredients_save')
+@receiver(post_delete, sender=RecipeIngredient,
+          dispatch_uid='recipe_cache_ingredients_delete')
+def invalidate_recipe_ingredients(sender, instance, **kwargs):
+    invalidate_recipes([instance.recipe_id])
+
+
+@receiver(post_save, sender=Favorite, dispatch_uid='recipe_cache_favorite_save')
+@receiver(post_delete, sender=Favorite,
+          dispatch_uid='recipe_cache_favorite_delete')
+@receiver(post_save, sender=ShoppingCart,
+          dispatch_uid='recipe_cache_shopping_cart_save')
+@receiver(post_delete, sender=ShoppingCart,
+          dispatch_uid='recipe_cache_shopping_cart_delete')
+def invalidate_counters(sender, **kwargs):
+    """Счётчики рецепта меняют порядок списка, например -favorites_count"""
+    recipe_cache.bump('list')
+
+
+@receiver(renditions_ready, dispatch_uid='recipe_cache_renditions')
+def invalidate_renditions(sender, recipe_ids, **kwargs):
+    invalidate_recipes(recipe_ids)
+
+
+@receiver(post_save, sender=Tag, dispatch_uid='recipe_cache_tag_save')
+@receiver(post_delete, sender=Tag, dispatch_uid='recipe_cache_tag_delete')
+def invalidate_tags(sender, **kwargs):
+    recipe_cache.bump('tags', 'list')
+
+
+@receiver(post_save, sender=Ingredient,
+          dispatch_uid='recipe_cache_ingredient_save')
+@receiver(post_delete, sender=Ingredient,
+          dispatch_uid='recipe_cache_ingredient_delete')
+def invalidate_ingredients(sender, **kwargs):
+    recipe_cache.bump('ingredients', 'list')
+
+
+@receiver(post_save, sender=User, dispatch_uid='recipe_cache_author_save')
+def invalidate_author(sender, instance, created, update_fields, **kwargs):
+    if created or (update_fields is not None
+                   and not AUTHOR_FIELDS & set(update_fields)):
+        return
+    recipe_cache.bump('list', author_generation(instance.pk))
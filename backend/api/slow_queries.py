@@ -0,0 +1,98 @@
+"""Выборка медленных запросов с планами выполнения.
+
+Запись и EXPLAIN идут в отдельном потоке после фиксации транзакции
+запроса, чтобы не задерживать ответ. Хранятся не больше
+SLOW_QUERY_MAX_ROWS отпечатков, не старше SLOW_QUERY_RETENTION_DAYS.
+"""
+import hashlib
+import logging
+import random
+import re
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import DatabaseError, connection, connections, transaction
+from django.db.models import F
+from django.db.models.functions import Greatest
+from django.utils import timezone
+
+from .models import SlowQuery
+
+logger = logging.getLogger('api.slow_queries')
+executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='slow-queries')
+
+PLACEHOLDER_LISTS = re.compile(r'\bIN\s*\(\s*%s(\s*,\s*%s)*\s*\)', re.I)
+NUMBERS = re.compile(r'\b\d+\b')
+SPACES = re.compile(r'\s+')
+
+
+def fingerprint(sql):
+    """Отпечаток запроса без чисел и длины списков IN"""
+    normalized = PLACEHOLDER_LISTS.sub('IN (...)', sql)
+    normalized = NUMBERS.sub('N', normalized)
+    normalized = SPACES.sub(' ', normalized).strip().lower()
+    return hashlib.sha1(normalized.encode()).hexdigest()
+
+
+def explain(sql, params):
+    connection = connections['default']
+    options = {'analyze': True} if settings.SLOW_QUERY_EXPLAIN_ANALYZE else {}
+    prefix = connection.ops.explain_query_prefix(**options)
+    with connection.cursor() as cursor:
+        cursor.execute(f'{prefix} {sql}', params)
+        return '\n'.join(' '.join(map(str, row)) for row in cursor.fetchall())
+
+
+def record(queries, view, action):
+    """Сохранить медленные запросы запроса, объединяя по отпечатку"""
+    for sql, params, duration in queries:
+        duration *= 1e3
+        plan = ''
+        try:
+            if (sql.lstrip()[:6].upper() == 'SELECT'
+                    and random.random() < settings.SLOW_QUERY_EXPLAIN_RATE):
+                plan = explain(sql, params)
+            key = fingerprint(sql)
+            changes = {
+                'count': F('count') + 1,
+                'total_ms': F('total_ms') + duration,
+                'max_ms': Greatest(F('max_ms'), duration),
+                'last_seen': timezone.now(),
+            }
+            if plan:
+                changes['plan'] = plan
+            if not SlowQuery.objects.filter(
+                    fingerprint=key).update(**changes):
+                _, created = SlowQuery.objects.get_or_create(
+                    fingerprint=key, defaults={
+                        'sql': sql, 'view': view or '',
+                        'action': action or '', 'total_ms': duration,
+                        'max_ms': duration, 'plan': plan,
+                    })
+                if created:
+                    prune()
+        except DatabaseError:
+            logger.exception('Не удалось сохранить медленный запрос')
+
+
+def prune():
+    """Удалить давно не встречавшиеся отпечатки и всё сверх лимита"""
+    SlowQuery.objects.filter(last_seen__lt=timezone.now() - timedelta(
+        days=settings.SLOW_QUERY_RETENTION_DAYS)).delete()
+    stale = SlowQuery.objects.order_by('-last_seen', '-id').values_list(
+        'id', flat=True)[settings.SLOW_QUERY_MAX_ROWS:]
+    SlowQuery.objects.filter(id__in=list(stale)).delete()
+
+
+def record_in_background(queries, view, action):
+    try:
+        record(queries, view, action)
+    finally:
+        connection.close()
+
+
+def schedule_record(queries, view, action):
+    """Записать медленные запросы в фоне после фиксации транзакции"""
+    transaction.on_commit(lambda: executor.submit(
+        record_in_background, queries, view, action))
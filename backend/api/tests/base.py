@@ -0,0 +1,56 @@
+"""Общая подготовка тестов api"""
+from tempfile import TemporaryDirectory
+
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from rest_framework.test import APIClient
+
+from recipes.models import Ingredient, Recipe, RecipeIngredient, Tag
+from users.models import User
+
+
+def create_user(username):
+    return User.objects.create(username=username,
+                               email=f'{username}@example.com')
+
+
+def create_ingredients(*names, measurement_unit='г'):
+    return [Ingredient.objects.create(name=name,
+                                      measurement_unit=measurement_unit)
+            for name in names]
+
+
+def create_tags(*slugs):
+    return [Tag.objects.create(name=slug, color='#E26C2D', slug=slug)
+            for slug in slugs]
+
+
+def create_recipe(author, name='Рецепт', ingredients=None, tags=(),
+                  **fields):
+    """Рецепт с составом {ингредиент: количество} и тегами"""
+    fields = {'text': 'Текст', 'cooking_time': 10, **fields}
+    recipe = Recipe.objects.create(author=author, name=name, **fields)
+    recipe.tags.set(tags)
+    RecipeIngredient.objects.bulk_create(
+        RecipeIngredient(recipe=recipe, ingredient=ingredient, amount=amount)
+        for ingredient, amount in (ingredients or {}).items())
+    return recipe
+
+
+class FoodgramTestCase(TestCase):
+    """Пустой кэш и клиент API, при temp_media - медиа во временной папке"""
+    temp_media = False
+
+    def setUp(self):
+        cache.clear()
+        if self.temp_media:
+            media = TemporaryDirectory()
+            self.addCleanup(media.cleanup)
+            media_settings = override_settings(MEDIA_ROOT=media.name)
+            media_settings.enable()
+            self.addCleanup(media_settings.disable)
+        self.client = APIClient()
+
+    def login(self, user):
+        self.client.force_authenticate(user)
+        return user
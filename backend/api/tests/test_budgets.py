@@ -0,0 +1,156 @@
+import re
+
+from django.conf import settings
+from django.db import connection
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import URLPattern, URLResolver, resolve
+
+from api.management.commands.bench_api import png_base64
+from api.middleware import get_budget
+from recipes.models import Favorite, ShoppingCart
+from users.models import Subscribe
+from .base import (FoodgramTestCase, create_ingredients, create_recipe,
+                   create_tags, create_user)
+
+
+def iter_routes(patterns=None):
+    """Имена маршрутов api.urls и методы их вьюх"""
+    if patterns is None:
+        from api.urls import urlpatterns as patterns
+    for pattern in patterns:
+        if isinstance(pattern, URLResolver):
+            yield from iter_routes(pattern.url_patterns)
+        elif isinstance(pattern, URLPattern) and pattern.name:
+            actions = getattr(pattern.callback, 'actions', None) or {}
+            yield pattern.name, {method.upper() for method in actions}
+
+
+class QueryBudgetMixin:
+    """Примесь к TestCase с assertWithinBudget"""
+
+    def assertWithinBudget(self, method, path, *args, client=None,
+                           **kwargs):
+        client = client or self.client
+        name, budget = get_budget(resolve(path.split('?')[0]),
+                                  method.upper())
+        with CaptureQueriesContext(connection) as context:
+            response = getattr(client, method)(path, *args, **kwargs)
+            if response.streaming:
+                b''.join(response.streaming_content)
+        self.assertLess(response.status_code, 400, response)
+        self.assertLessEqual(
+            len(context), budget['queries'],
+            f'{method.upper()} {name}: {len(context)} запросов при бюджете '
+            f'{budget["queries"]}'
+        )
+        return response
+
+
+class QueryBudgetTest(QueryBudgetMixin, FoodgramTestCase):
+    """Маршруты api укладываются в бюджеты своих методов"""
+    temp_media = True
+
+    def setUp(self):
+        super().setUp()
+        self.user = self.login(create_user('reader'))
+        self.author = create_user('author')
+        self.tags = create_tags('breakfast', 'lunch')
+        self.ingredients = create_ingredients(
+            *(f'ингредиент {number}' for number in range(5)))
+        self.recipes = [
+            create_recipe(self.author, f'Рецепт {number}',
+                          dict.fromkeys(self.ingredients, 10), self.tags)
+            for number in range(8)]
+        Subscribe.objects.create(user=self.user, author=self.author)
+        for recipe in self.recipes[:3]:
+            Favorite.objects.create(user=self.user, recipe=recipe)
+            ShoppingCart.objects.create(user=self.user, recipe=recipe)
+
+    def payload(self):
+        return {
+            'ingredients': [{'id': ingredient.id, 'amount': 5}
+                            for ingredient in self.ingredients],
+            'tags': [tag.id for tag in self.tags],
+            'image': png_base64(),
+            'name': 'Новый',
+            'text': 'Текст',
+            'cooking_time': 5,
+        }
+
+    def test_every_route_has_budget(self):
+        for name, methods in iter_routes():
+            with self.subTest(name=name):
+                if methods:
+                    self.assertTrue(any(
+                        (name, method) in settings.QUERY_BUDGETS
+                        for method in methods))
+
+    def test_writes_use_their_own_budget(self):
+        match = resolve('/api/recipes/')
+        self.assertNotEqual(get_budget(match, 'POST'),
+                            get_budget(match, 'GET'))
+        self.assertEqual(get_budget(match, 'HEAD'),
+                         get_budget(match, 'GET'))
+
+    def test_reads(self):
+        recipe = self.recipes[0]
+        ingredients = ','.join(str(ingredient.id)
+                               for ingredient in self.ingredients[:3])
+        for path in ('/api/recipes/', '/api/recipes/?tags=breakfast'
+                     '&tags=lunch&is_favorited=1&is_in_shopping_cart=1',
+                     f'/api/recipes/{recipe.id}/', '/api/tags/',
+                     f'/api/tags/{self.tags[0].id}/', '/api/ingredients/',
+                     f'/api/ingredients/{self.ingredients[0].id}/',
+                     '/api/users/subscriptions/',
+                     '/api/recipes/download_shopping_cart/',
+                     f'/api/recipes/match/?ingredients={ingredients}',
+                     '/api/recipes/feed/',
+                     f'/api/recipes/{recipe.id}/similar/'):
+            with self.subTest(path=path):
+                self.assertWithinBudget('get', path)
+
+    def test_writes(self):
+        recipe, other = self.recipes[-2:]
+        response = self.assertWithinBudget(
+            'post', '/api/recipes/', self.payload(), format='json')
+        created = response.data['id']
+        self.login(self.author)
+        self.assertWithinBudget(
+            'patch', f'/api/recipes/{recipe.id}/', self.payload(),
+            format='json')
+        self.assertWithinBudget('delete', f'/api/recipes/{other.id}/')
+        self.login(self.user)
+        for route in ('favorite', 'shopping_cart'):
+            for method in ('post', 'delete'):
+                with self.subTest(route=route, method=method):
+                    self.assertWithinBudget(
+                        method, f'/api/recipes/{created}/{route}/')
+        for method in ('delete', 'post'):
+            with self.subTest(route='subscribe', method=method):
+                self.assertWithinBudget(
+                    method, f'/api/users/{self.author.id}/subscribe/')
+
+    @override_settings(QUERY_BUDGETS={
+        ('download_shopping_cart', 'GET'): {'queries': 0, 'time_ms': 1e6},
+    })
+    def test_streamed_queries_are_counted(self):
+        response = self.client.get('/api/recipes/download_shopping_cart/')
+        with self.assertLogs('api.budget', 'WARNING') as logs:
+            b''.join(response.streaming_content)
+        self.assertIn('download_shopping_cart', logs.output[0])
+
+    def test_serialization_timing(self):
+        timing = self.client.get('/api/recipes/')['Server-Timing']
+        durations = dict(re.findall(r'(\w+);dur=([\d.]+)', timing))
+        self.assertGreater(float(durations['serialize']), 0)
+        self.assertAlmostEqual(
+            sum(float(durations[name])
+                for name in ('db', 'app', 'serialize', 'render')),
+            float(durations['total']), delta=0.5)
+
+    def test_only_api_paths_are_measured(self):
+        self.assertIn('Server-Timing', self.client.get('/api/tags/'))
+        response = self.client.get('/admin/login/')
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn('Server-Timing', response)
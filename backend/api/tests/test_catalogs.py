@@ -0,0 +1,39 @@
+from io import StringIO
+from pathlib import Path
+from tempfile import TemporaryDirectory
+
+from django.core.management import call_command
+
+from .base import FoodgramTestCase, create_ingredients, create_tags
+
+
+class PublicCatalogTest(FoodgramTestCase):
+    """Справочники не проверяют токен, даже неверный"""
+
+    def setUp(self):
+        super().setUp()
+        create_tags('breakfast')
+        create_ingredients('соль')
+
+    def test_invalid_token_is_ignored(self):
+        self.client.credentials(HTTP_AUTHORIZATION='Token invalid')
+        for url in ('/api/tags/', '/api/ingredients/',
+                    '/api/ingredients/?name=со'):
+            with self.subTest(url=url):
+                response = self.client.get(url)
+                self.assertEqual(response.status_code, 200)
+                self.assertEqual(len(response.json()), 1)
+        self.assertEqual(self.client.get('/api/recipes/').status_code, 401)
+
+    def test_loaded_ingredients_are_served(self):
+        self.assertEqual(len(self.client.get('/api/ingredients/').json()), 1)
+        with TemporaryDirectory() as directory:
+            path = Path(directory) / 'ingredients.csv'
+            path.write_text('перец,г\nсоль,г\n', encoding='utf-8')
+            call_command('load_cvs_data', str(path), stdout=StringIO())
+        names = [ingredient['name'] for ingredient in
+                 self.client.get('/api/ingredients/').json()]
+        self.assertEqual(sorted(names), ['перец', 'соль'])
+        self.assertEqual(
+            self.client.get('/api/ingredients/?name=пер').json()[0]['name'],
+            'перец')
@@ -0,0 +1,70 @@
+from io import StringIO
+
+from django.core.management import call_command
+
+from recipes.counters import change_counter
+from recipes.models import Recipe
+from users.models import User
+from .base import FoodgramTestCase, create_recipe, create_user
+
+
+class CountersTest(FoodgramTestCase):
+    """Денормализованные счётчики следуют за связями и не уходят в минус"""
+
+    def setUp(self):
+        super().setUp()
+        self.author = create_user('author')
+        self.user = self.login(create_user('reader'))
+        self.recipe = create_recipe(self.author, 'Суп')
+
+    def assertCounters(self, **expected):
+        self.recipe.refresh_from_db()
+        self.author.refresh_from_db()
+        actual = {
+            'favorites_count': self.recipe.favorites_count,
+            'in_shopping_cart_count': self.recipe.in_shopping_cart_count,
+            'recipes_count': self.author.recipes_count,
+            'followers_count': self.author.followers_count,
+        }
+        self.assertEqual({name: actual[name] for name in expected}, expected)
+
+    def test_recipe_counters(self):
+        for route, counter in (('favorite', 'favorites_count'),
+                               ('shopping_cart', 'in_shopping_cart_count')):
+            url = f'/api/recipes/{self.recipe.id}/{route}/'
+            with self.subTest(route=route):
+                self.client.post(url)
+                self.client.post(url)
+                self.assertCounters(**{counter: 1})
+                self.client.delete(url)
+                self.client.delete(url)
+                self.assertCounters(**{counter: 0})
+
+    def test_user_counters(self):
+        url = f'/api/users/{self.author.id}/subscribe/'
+        self.client.post(url)
+        self.assertCounters(followers_count=1, recipes_count=1)
+        self.client.delete(url)
+        create_recipe(self.author, 'Каша').delete()
+        self.assertCounters(followers_count=0, recipes_count=1)
+        self.recipe.delete()
+        self.author.refresh_from_db()
+        self.assertEqual(self.author.recipes_count, 0)
+
+    def test_counter_never_goes_negative(self):
+        recipes = Recipe.objects.filter(pk=self.recipe.pk)
+        change_counter(recipes, 'favorites_count', -1)
+        self.assertCounters(favorites_count=0)
+        change_counter(recipes, 'favorites_count', 2)
+        change_counter(recipes, 'favorites_count', -3)
+        self.assertCounters(favorites_count=2)
+
+    def test_recount_counters(self):
+        Recipe.objects.update(favorites_count=5, in_shopping_cart_count=0)
+        User.objects.update(recipes_count=0, followers_count=3)
+        self.client.post(f'/api/recipes/{self.recipe.id}/shopping_cart/')
+        out = StringIO()
+        call_command('recount_counters', stdout=out)
+        self.assertIn('Recipe.favorites_count: исправлено 1', out.getvalue())
+        self.assertCounters(favorites_count=0, in_shopping_cart_count=1,
+                            recipes_count=1, followers_count=0)
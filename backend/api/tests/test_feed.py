@@ -0,0 +1,97 @@
+from datetime import timedelta
+from unittest import mock
+
+from django.utils import timezone
+
+from recipes.feed import fan_out, fill_inbox, merged_feed
+from recipes.models import FeedItem, Recipe
+from users.models import Subscribe
+from .base import FoodgramTestCase, create_recipe, create_user
+
+
+class FeedTest(FoodgramTestCase):
+    """Лента слиянием и лента из входящих отдают одно и то же"""
+
+    def setUp(self):
+        super().setUp()
+        self.authors = [create_user(f'author{number}') for number in range(3)]
+        now = timezone.now()
+        for number in range(9):
+            recipe = create_recipe(self.authors[number % 3],
+                                   f'Рецепт {number}')
+            Recipe.objects.filter(pk=recipe.pk).update(
+                pub_date=now - timedelta(hours=number // 2))
+        self.merged = create_user('merged')
+        self.inbox = create_user('inbox')
+        self.inbox.has_feed_inbox = True
+        self.inbox.save()
+        for user in (self.merged, self.inbox):
+            for author in self.authors[:2]:
+                Subscribe.objects.create(user=user, author=author)
+
+    def expected(self, *authors):
+        return list(Recipe.objects.filter(author__in=authors).order_by(
+            '-pub_date', '-id').values_list('id', flat=True))
+
+    def feed_ids(self, user, limit=2):
+        self.login(user)
+        ids, url = [], f'/api/recipes/feed/?limit={limit}'
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            ids += [recipe['id'] for recipe in response.data['results']]
+            url = response.data['next']
+        return ids
+
+    def inbox_ids(self):
+        return set(FeedItem.objects.filter(user=self.inbox).values_list(
+            'recipe_id', flat=True))
+
+    def test_merged_matches_inbox(self):
+        expected = self.expected(*self.authors[:2])
+        self.assertEqual(self.feed_ids(self.merged), expected)
+        self.assertEqual(self.feed_ids(self.inbox), expected)
+        self.assertEqual(self.feed_ids(self.merged, limit=4), expected)
+
+    def test_merge_across_batches(self):
+        author_ids = [author.id for author in self.authors]
+        with mock.patch('recipes.feed.FEED_MERGE_BATCH', 1):
+            keys = merged_feed(author_ids, None, 4)
+            self.assertEqual([recipe_id for _, recipe_id in keys],
+                             self.expected(*self.authors)[:4])
+            self.assertEqual(
+                [recipe_id for _, recipe_id in
+                 merged_feed(author_ids, keys[-1], 20)],
+                self.expected(*self.authors)[4:])
+
+    def test_anonymous(self):
+        self.assertEqual(
+            self.client.get('/api/recipes/feed/').status_code, 401)
+
+    def test_fill_inbox_on_subscribe(self):
+        self.assertEqual(self.inbox_ids(), set(self.expected(
+            *self.authors[:2])))
+        Subscribe.objects.create(user=self.inbox, author=self.authors[2])
+        self.assertEqual(self.inbox_ids(), set(self.expected(*self.authors)))
+        FeedItem.objects.filter(user=self.inbox).delete()
+        fill_inbox(self.inbox.id, [self.authors[0].id])
+        self.assertEqual(self.inbox_ids(),
+                         set(self.expected(self.authors[0])))
+
+    def test_fan_out(self):
+        recipe = create_recipe(self.authors[0], 'Новый')
+        self.assertIn(recipe.id, self.inbox_ids())
+        self.assertFalse(FeedItem.objects.filter(user=self.merged).exists())
+        FeedItem.objects.filter(recipe=recipe).delete()
+        fan_out(recipe)
+        self.assertEqual(
+            list(FeedItem.objects.filter(recipe=recipe).values_list(
+                'user_id', 'pub_date')),
+            [(self.inbox.id, recipe.pub_date)])
+
+    def test_clear_feed_on_unsubscribe(self):
+        Subscribe.objects.get(user=self.inbox, author=self.authors[0]).delete()
+        self.assertEqual(self.inbox_ids(),
+                         set(self.expected(self.authors[1])))
+        self.assertEqual(self.feed_ids(self.inbox),
+                         self.expected(self.authors[1]))
@@ -0,0 +1,78 @@
+from rest_framework.test import APIRequestFactory
+
+from api.filters import RecipeFilter
+from recipes.models import Favorite, Recipe
+from .base import FoodgramTestCase, create_recipe, create_tags, create_user
+
+
+class RecipeTagFilterTest(FoodgramTestCase):
+    """Фильтры тегов и избранного - EXISTS без JOIN и DISTINCT"""
+
+    def setUp(self):
+        super().setUp()
+        self.user = self.login(create_user('cook'))
+        breakfast, lunch = create_tags('breakfast', 'lunch')
+        self.both = create_recipe(self.user, 'Оба', tags=[breakfast, lunch])
+        self.one = create_recipe(self.user, 'Один', tags=[lunch])
+        create_recipe(self.user, 'Без тегов')
+        Favorite.objects.create(user=self.user, recipe=self.both)
+
+    def test_sql_has_no_join_or_distinct(self):
+        request = APIRequestFactory().get('/api/recipes/')
+        request.user = self.user
+        for params in ({'tags': ['breakfast', 'lunch']},
+                       {'tags': ['breakfast', 'lunch'], 'is_favorited': '1',
+                        'is_in_shopping_cart': '1'}):
+            with self.subTest(params=params):
+                sql = str(RecipeFilter(
+                    params, queryset=Recipe.objects.all(), request=request
+                ).qs.query).upper()
+                self.assertIn('EXISTS', sql)
+                self.assertNotIn('JOIN', sql)
+                self.assertNotIn('DISTINCT', sql)
+
+    def test_one_row_per_recipe(self):
+        response = self.client.get('/api/recipes/?tags=breakfast&tags=lunch')
+        self.assertEqual(response.status_code, 200)
+        ids = [recipe['id'] for recipe in response.data['results']]
+        self.assertCountEqual(ids, [self.both.id, self.one.id])
+        self.assertEqual(response.data['count'], 2)
+
+
+class TagFacetsTest(FoodgramTestCase):
+    """Счётчики тегов учитывают фильтры запроса, кроме самих тегов"""
+
+    def setUp(self):
+        super().setUp()
+        self.cook = create_user('cook')
+        self.other = create_user('other')
+        breakfast, lunch = create_tags('breakfast', 'lunch')
+        both = create_recipe(self.cook, 'Оба', tags=[breakfast, lunch])
+        lunch_only = create_recipe(self.cook, 'Обед', tags=[lunch])
+        create_recipe(self.other, 'Завтрак', tags=[breakfast])
+        for recipe in (both, lunch_only):
+            Favorite.objects.create(user=self.cook, recipe=recipe)
+
+    def facets(self, query=''):
+        response = self.client.get(f'/api/recipes/?facets=1{query}')
+        self.assertEqual(response.status_code, 200)
+        return response.data['facets']
+
+    def test_public_filters(self):
+        everything = {'breakfast': 2, 'lunch': 2}
+        self.assertEqual(self.facets(), everything)
+        self.assertEqual(self.facets('&tags=breakfast'), everything)
+        self.assertEqual(self.facets(f'&author={self.cook.id}'),
+                         {'breakfast': 1, 'lunch': 2})
+        self.assertEqual(self.facets('&search=завтрак'), {'breakfast': 1})
+
+    def test_personal_filters(self):
+        self.assertEqual(self.facets('&is_favorited=1'),
+                         {'breakfast': 2, 'lunch': 2})
+        self.login(self.cook)
+        self.assertEqual(self.facets('&is_favorited=1'),
+                         {'breakfast': 1, 'lunch': 2})
+        self.login(self.other)
+        self.assertEqual(self.facets('&is_favorited=1'), {})
+        self.assertEqual(self.facets('&is_in_shopping_cart=1'), {})
+        self.assertEqual(self.facets(), {'breakfast': 2, 'lunch': 2})
@@ -0,0 +1,141 @@
+import io
+import tracemalloc
+
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from PIL import Image
+from rest_framework.test import APIRequestFactory
+
+from api.fields import Base64ImageField
+from api.management.commands.bench_image_upload import MEGABYTE, noise_base64
+from api.parsers import LimitedJSONParser, RequestTooLarge
+from api.response_cache import recipe_cache, recipe_generation
+from recipes.constants import IMAGE_DECODE_CHUNK_SIZE, IMAGE_SPOOL_SIZE
+from recipes.images import make_renditions, rendition_name
+from .base import FoodgramTestCase, create_recipe, create_user
+
+
+class RenditionsTest(FoodgramTestCase):
+    """Фоновая обработка уменьшает оригинал и сбрасывает кэш рецепта"""
+    temp_media = True
+
+    def setUp(self):
+        super().setUp()
+        image = Image.new('RGB', (3000, 400), '#FFAA00')
+        exif = image.getexif()
+        exif[0x0112] = 6
+        buffer = io.BytesIO()
+        image.save(buffer, 'JPEG', exif=exif)
+        self.name = default_storage.save(
+            'recipes/images/big.jpg', ContentFile(buffer.getvalue()))
+        self.recipe = create_recipe(create_user('author'), 'Пирог',
+                                    image=self.name)
+
+    def test_original_is_normalized(self):
+        names = [recipe_generation(self.recipe.id)]
+        generation = recipe_cache.generations(names)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(make_renditions(self.name), 1)
+        with default_storage.open(self.name) as file:
+            image = Image.open(file)
+            self.assertEqual(image.size, (273, 2048))
+            self.assertFalse(image.getexif())
+        for rendition in ('card', 'detail'):
+            self.assertTrue(default_storage.exists(
+                rendition_name(self.name, rendition)))
+        self.recipe.refresh_from_db()
+        self.assertTrue(self.recipe.has_renditions)
+        self.assertNotEqual(recipe_cache.generations(names), generation)
+
+
+class ImageCleanupTest(FoodgramTestCase):
+    """Файлы заменённой или удалённой картинки удаляются после фиксации"""
+    temp_media = True
+
+    def setUp(self):
+        super().setUp()
+        self.author = create_user('author')
+        self.name = self.save_image('old.png')
+        self.recipe = create_recipe(self.author, 'Пирог', image=self.name)
+
+    def save_image(self, name):
+        buffer = io.BytesIO()
+        Image.new('RGB', (10, 10)).save(buffer, 'PNG')
+        name = default_storage.save(f'recipes/images/{name}',
+                                    ContentFile(buffer.getvalue()))
+        make_renditions(name)
+        return name
+
+    def files(self, name):
+        return [name, *(rendition_name(name, rendition)
+                        for rendition in ('card', 'detail'))]
+
+    def assertDeleted(self, name, deleted=True):
+        for file_name in self.files(name):
+            with self.subTest(file_name=file_name):
+                self.assertEqual(not default_storage.exists(file_name),
+                                 deleted)
+
+    def test_replaced_image(self):
+        self.recipe.image = self.save_image('new.png')
+        with self.captureOnCommitCallbacks(execute=True):
+            self.recipe.save()
+            self.assertDeleted(self.name, False)
+        self.assertDeleted(self.name)
+        self.assertDeleted(self.recipe.image.name, False)
+
+    def test_deleted_recipe(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.recipe.delete()
+        self.assertDeleted(self.name)
+
+    def test_shared_image_is_kept(self):
+        create_recipe(self.author, 'Копия', image=self.name)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.recipe.delete()
+        self.assertDeleted(self.name, False)
+
+    def test_save_without_image_change(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.recipe.save(update_fields=['name'])
+            self.recipe.save()
+        self.assertDeleted(self.name, False)
+
+
+class UploadLimitTest(FoodgramTestCase):
+    """Тело запроса и картинка не читаются в память целиком"""
+
+    def parse(self, body, **meta):
+        parser = LimitedJSONParser()
+        parser.max_size = 100
+        request = APIRequestFactory().generic(
+            'POST', '/api/recipes/', content_type='application/json')
+        request.META.pop('CONTENT_LENGTH', None)
+        request.META.update(meta)
+        return parser.parse(io.BytesIO(body),
+                            parser_context={'request': request})
+
+    def test_body_without_length_is_limited(self):
+        self.assertEqual(self.parse('{"name": "Суп"}'.encode()),
+                         {'name': 'Суп'})
+        for meta in ({}, {'HTTP_TRANSFER_ENCODING': 'chunked'},
+                     {'CONTENT_LENGTH': '10'}):
+            with self.subTest(meta=meta), self.assertRaises(RequestTooLarge):
+                self.parse(b'{"text": "' + b'x' * 200 + b'"}', **meta)
+
+    def test_declared_length_is_checked_first(self):
+        with self.assertRaises(RequestTooLarge):
+            self.parse(b'{}', CONTENT_LENGTH='101')
+
+    def test_image_decoding_memory_is_bounded(self):
+        payload = noise_base64(3 * MEGABYTE)
+        tracemalloc.start()
+        try:
+            uploaded = Base64ImageField().run_validation(payload)
+            peak = tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+        uploaded.close()
+        self.assertGreater(uploaded.size, 2 * MEGABYTE)
+        self.assertLess(peak,
+                        2 * IMAGE_SPOOL_SIZE + 4 * IMAGE_DECODE_CHUNK_SIZE)
@@ -0,0 +1,78 @@
+from unittest import mock
+
+from django.utils import timezone
+
+from recipes import matcher
+from recipes.models import RecipeIngredient
+from .base import (FoodgramTestCase, create_ingredients, create_recipe,
+                   create_user)
+
+
+class RecipeMatcherSyncTest(FoodgramTestCase):
+    """Индекс подбора догоняет удаления, сделанные другими процессами"""
+
+    def setUp(self):
+        super().setUp()
+        patcher = mock.patch.object(matcher, '_matcher', None)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        author = self.login(create_user('author'))
+        self.salt, self.water = create_ingredients('соль', 'вода')
+        self.recipes = [
+            create_recipe(author, f'Рецепт {number}',
+                          {self.salt: 1, self.water: 1})
+            for number in range(3)]
+
+    def test_sync_drops_deleted_and_emptied_recipes(self):
+        since = timezone.now()
+        other_process = matcher.build()
+        deleted, emptied, kept = self.recipes
+        deleted.delete()
+        RecipeIngredient.objects.filter(recipe=emptied).delete()
+        matcher.sync(other_process, since)
+        self.assertEqual(
+            [recipe_id for recipe_id, *_ in other_process.match(
+                [self.salt.id])],
+            [kept.id])
+
+    def test_match_count_after_composition_delete(self):
+        url = f'/api/recipes/match/?ingredients={self.salt.id}'
+        self.assertEqual(self.client.get(url).data['count'], 3)
+        RecipeIngredient.objects.filter(recipe=self.recipes[0]).delete()
+        response = self.client.get(url)
+        self.assertEqual(response.data['count'], 2)
+        self.assertEqual(len(response.data['results']), 2)
+
+    def test_sync_reads_without_lock(self):
+        matcher.get_matcher()
+        fetch_changes, locked = matcher.fetch_changes, []
+
+        def fetch(since):
+            locked.append(matcher._lock.locked())
+            return fetch_changes(since)
+
+        with mock.patch.object(matcher, 'fetch_changes', fetch):
+            matcher.get_matcher()
+        self.assertEqual(locked, [False])
+
+    def test_delete_leaves_index_until_commit(self):
+        index = matcher.get_matcher()
+        recipe = self.recipes[0]
+        with self.captureOnCommitCallbacks() as callbacks:
+            recipe.delete()
+        self.assertEqual(len(index.match([self.salt.id])), 3)
+        for callback in callbacks:
+            callback()
+        self.assertEqual(len(index.match([self.salt.id])), 2)
+
+    def test_postings_stay_sorted(self):
+        index = matcher.build()
+        first, second, third = (recipe.id for recipe in self.recipes)
+        index.replace(second, [self.water.id])
+        index.replace(second, [self.salt.id, self.water.id])
+        self.assertEqual(list(index.postings[self.salt.id]),
+                         [first, second, third])
+        index.replace(first, ())
+        index.replace(first, ())
+        self.assertEqual(list(index.postings[self.salt.id]),
+                         [second, third])
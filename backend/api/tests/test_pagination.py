@@ -0,0 +1,71 @@
+from django.utils import timezone
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+
+from api.pagination import RecipeCursorPagination, RecipePagination
+from recipes.constants import MAX_PAGE_SIZE
+from recipes.models import Recipe
+from .base import FoodgramTestCase, create_user
+
+
+class RecipeCursorPaginationTest(FoodgramTestCase):
+    """Курсор по (-pub_date, -id) не теряет и не повторяет рецепты"""
+
+    def setUp(self):
+        super().setUp()
+        user = self.login(create_user('reader'))
+        Recipe.objects.bulk_create(
+            Recipe(author=user, name=f'Рецепт {number}', text='Текст',
+                   cooking_time=10)
+            for number in range(11)
+        )
+        # Больше рецептов с одинаковой датой, чем помещается на страницу
+        Recipe.objects.filter(name__in=[
+            f'Рецепт {number}' for number in range(2, 9)
+        ]).update(pub_date=timezone.now())
+        self.expected = list(Recipe.objects.order_by(
+            '-pub_date', '-id').values_list('id', flat=True))
+
+    def walk(self, url, link):
+        ids, pages = [], 0
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            page = [recipe['id'] for recipe in response.data['results']]
+            ids = ids + page if link == 'next' else page + ids
+            url = response.data[link]
+            pages += 1
+            self.assertLess(pages, 10)
+        return ids, response
+
+    def test_pages_across_equal_pub_date(self):
+        ids, last = self.walk('/api/recipes/?cursor=&limit=3', 'next')
+        self.assertEqual(ids, self.expected)
+        response = self.client.get('/api/recipes/?cursor=&limit=3')
+        self.assertIsNone(response.data['previous'])
+        back, _ = self.walk(last.data['previous'], 'previous')
+        self.assertEqual(back, self.expected[:len(back)])
+        self.assertEqual(len(back), 9)
+
+    def test_cursor_rejects_other_ordering(self):
+        response = self.client.get(
+            '/api/recipes/?cursor=&ordering=-favorites_count')
+        self.assertEqual(response.status_code, 400)
+
+    def test_invalid_cursor(self):
+        response = self.client.get('/api/recipes/?cursor=broken')
+        self.assertEqual(response.status_code, 404)
+
+
+class PageSizeTest(FoodgramTestCase):
+    """Размер страницы из limit ограничен в обоих режимах"""
+
+    def test_limit_parsing(self):
+        factory = APIRequestFactory()
+        for paginator in (RecipePagination(), RecipeCursorPagination()):
+            for limit, expected in (('3', 3), ('100000', MAX_PAGE_SIZE),
+                                    ('0', 6), ('-2', 6), ('abc', 6)):
+                with self.subTest(paginator=paginator, limit=limit):
+                    request = Request(factory.get('/', {'limit': limit}))
+                    self.assertEqual(paginator.get_page_size(request),
+                                     expected)
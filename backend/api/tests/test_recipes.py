@@ -0,0 +1,104 @@
+from django.urls import resolve
+
+from recipes.models import Recipe, RecipeIngredient, RecipeSimilarity
+from .base import (FoodgramTestCase, create_ingredients, create_recipe,
+                   create_tags, create_user)
+
+
+class RecipeIngredientETagTest(FoodgramTestCase):
+    """Прямая запись состава (админка) меняет ETag рецепта"""
+
+    def setUp(self):
+        super().setUp()
+        user = self.login(create_user('admin'))
+        self.recipe = create_recipe(user, 'Суп')
+        self.salt, self.water = create_ingredients('соль', 'вода')
+        self.url = f'/api/recipes/{self.recipe.id}/'
+
+    def assertChanged(self, change):
+        etag = self.client.get(self.url)['ETag']
+        change()
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+
+    def test_save_and_delete_change_etag(self):
+        row = RecipeIngredient(
+            recipe=self.recipe, ingredient=self.salt, amount=5)
+        self.assertChanged(row.save)
+
+        def change_amount():
+            row.amount = 7
+            row.save()
+
+        self.assertChanged(change_amount)
+        self.assertChanged(row.delete)
+
+    def test_queryset_delete_changes_etag(self):
+        RecipeIngredient.objects.bulk_create([
+            RecipeIngredient(recipe=self.recipe, ingredient=ingredient,
+                             amount=1)
+            for ingredient in (self.salt, self.water)])
+        self.assertChanged(
+            RecipeIngredient.objects.filter(recipe=self.recipe).delete)
+
+
+class TouchRecipesTest(FoodgramTestCase):
+    """Рецепты обновляются, только если изменилось видимое в них"""
+
+    def setUp(self):
+        super().setUp()
+        self.tag, = create_tags('breakfast')
+        self.salt, = create_ingredients('соль')
+        self.recipe = create_recipe(create_user('cook'), 'Суп',
+                                    {self.salt: 5}, [self.tag])
+
+    def assertTouched(self, change, touched):
+        Recipe.objects.filter(pk=self.recipe.pk).update(
+            updated_at=self.recipe.pub_date)
+        change()
+        updated_at = Recipe.objects.values_list(
+            'updated_at', flat=True).get(pk=self.recipe.pk)
+        self.assertEqual(updated_at != self.recipe.pub_date, touched)
+
+    def test_tag(self):
+        self.assertTouched(self.tag.save, False)
+        self.tag.color = '#000000'
+        self.assertTouched(self.tag.save, True)
+        self.assertTouched(self.tag.delete, True)
+
+    def test_ingredient(self):
+        self.assertTouched(self.salt.save, False)
+        self.salt.measurement_unit = 'щепотка'
+        self.assertTouched(self.salt.save, True)
+        self.assertTouched(self.salt.delete, True)
+
+
+class SimilarRecipesTest(FoodgramTestCase):
+    """Похожие рецепты - действие RecipeViewSet"""
+
+    def setUp(self):
+        super().setUp()
+        author = create_user('author')
+        self.recipe, *self.others = (
+            create_recipe(author, f'Рецепт {number}') for number in range(4))
+        RecipeSimilarity.objects.bulk_create(
+            RecipeSimilarity(recipe=self.recipe, similar=other, score=score)
+            for other, score in zip(self.others, (0.2, 0.9, 0.5)))
+
+    def test_ordered_by_score(self):
+        response = self.client.get(
+            f'/api/recipes/{self.recipe.id}/similar/?limit=2')
+        self.assertEqual(resolve(
+            f'/api/recipes/{self.recipe.id}/similar/').url_name,
+            'recipes-similar')
+        self.assertEqual([item['id'] for item in response.data],
+                         [self.others[1].id, self.others[2].id])
+        self.assertEqual(response.data[0]['score'], 0.9)
+
+    def test_missing_recipe(self):
+        self.assertEqual(self.client.get(
+            f'/api/recipes/{self.others[0].id}/similar/').data, [])
+        for pk in (0, 'abc'):
+            with self.subTest(pk=pk):
+                response = self.client.get(f'/api/recipes/{pk}/similar/')
+                self.assertEqual(response.status_code, 404)
@@ -0,0 +1,76 @@
+from recipes.models import Favorite
+from .base import FoodgramTestCase, create_recipe, create_tags, create_user
+
+
+class ResponseCacheTest(FoodgramTestCase):
+    """Ответы анонимам кэшируются и сбрасываются записью данных"""
+
+    def setUp(self):
+        super().setUp()
+        self.author = create_user('author')
+        self.tag, = create_tags('breakfast')
+        self.recipe = create_recipe(self.author, 'Суп', tags=[self.tag])
+        self.other = create_recipe(self.author, 'Каша')
+        self.list_url = '/api/recipes/?ordering=-favorites_count'
+        self.detail_url = f'/api/recipes/{self.recipe.id}/'
+
+    def cache_status(self, url):
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return response['X-Cache']
+
+    def assertInvalidated(self, change, *urls):
+        for url in urls:
+            self.cache_status(url)
+            self.assertEqual(self.cache_status(url), 'HIT')
+        with self.captureOnCommitCallbacks(execute=True):
+            change()
+        for url in urls:
+            with self.subTest(url=url):
+                self.assertEqual(self.cache_status(url), 'MISS')
+
+    def test_hit_and_miss(self):
+        self.assertEqual(self.cache_status(self.list_url), 'MISS')
+        self.assertEqual(self.cache_status(self.list_url), 'HIT')
+        self.assertEqual(self.cache_status('/api/recipes/?ordering=-pub_date'),
+                         'MISS')
+        self.login(self.author)
+        self.assertNotIn('X-Cache', self.client.get(self.list_url))
+
+    def test_patch(self):
+        def patch():
+            self.login(self.author)
+            response = self.client.patch(
+                self.detail_url, {'name': 'Борщ'}, format='json')
+            self.assertEqual(response.status_code, 200, response.data)
+            self.client.force_authenticate(None)
+
+        self.assertInvalidated(patch, self.list_url, self.detail_url)
+        self.assertEqual(self.client.get(self.detail_url).data['name'],
+                         'Борщ')
+
+    def test_tag_edit(self):
+        def rename():
+            self.tag.name = 'Завтрак'
+            self.tag.save()
+
+        self.assertInvalidated(rename, self.list_url, self.detail_url)
+
+    def test_author_edit(self):
+        def rename():
+            self.author.first_name = 'Повар'
+            self.author.save()
+
+        self.assertInvalidated(rename, self.list_url, self.detail_url)
+        self.assertEqual(
+            self.client.get(self.detail_url).data['author']['first_name'],
+            'Повар')
+
+    def test_favorite_reorders_list(self):
+        def favorite():
+            Favorite.objects.create(user=create_user('reader'),
+                                    recipe=self.recipe)
+
+        self.assertInvalidated(favorite, self.list_url)
+        self.assertEqual(self.client.get(self.list_url).data['results'][0][
+            'id'], self.recipe.id)
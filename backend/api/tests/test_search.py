@@ -0,0 +1,65 @@
+from unittest import skipUnless
+
+from django.apps import apps
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from recipes.search import FTS_TABLE, ensure_index
+from .base import FoodgramTestCase, create_recipe, create_user
+
+
+@skipUnless(connection.vendor == 'sqlite', 'Таблица FTS5 есть только в SQLite')
+class EnsureIndexTest(FoodgramTestCase):
+    """После migrate индекс FTS5 перестраивается, только если он неполный"""
+
+    def setUp(self):
+        super().setUp()
+        self.recipe = create_recipe(create_user('cook'), 'Борщ')
+
+    def ensure_index(self):
+        with CaptureQueriesContext(connection) as context:
+            ensure_index(apps.get_app_config('recipes'), 'default')
+        return len(context)
+
+    def search(self, word):
+        with connection.cursor() as cursor:
+            cursor.execute(f'SELECT rowid FROM {FTS_TABLE} '
+                           f'WHERE {FTS_TABLE} MATCH %s', [word])
+            return [rowid for rowid, in cursor.fetchall()]
+
+    def test_complete_index_is_left_alone(self):
+        self.assertEqual(self.ensure_index(), 1)
+        self.assertEqual(self.search('Борщ'), [self.recipe.id])
+
+    def test_missing_trigger_is_recreated(self):
+        with connection.cursor() as cursor:
+            cursor.execute(f'DROP TRIGGER {FTS_TABLE}_update')
+        self.assertGreater(self.ensure_index(), 1)
+        self.recipe.name = 'Щи'
+        self.recipe.save()
+        self.assertEqual(self.search('Щи'), [self.recipe.id])
+
+
+class RecipeSearchTest(FoodgramTestCase):
+    """Поиск ставит совпадения в названии выше и не работает с курсором"""
+
+    def setUp(self):
+        super().setUp()
+        author = create_user('cook')
+        self.in_text = create_recipe(author, 'Суп', text='Свёкла и капуста')
+        self.in_name = create_recipe(author, 'Свекольник')
+        create_recipe(author, 'Каша')
+
+    def test_name_matches_first(self):
+        self.in_name.name = 'Свёкла тушёная'
+        self.in_name.save()
+        response = self.client.get('/api/recipes/?search=свекла')
+        self.assertEqual([recipe['id'] for recipe in response.data['results']],
+                         [self.in_name.id, self.in_text.id])
+
+    def test_cursor_rejects_search(self):
+        response = self.client.get('/api/recipes/?cursor=&search=свекла')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('search', response.data)
+        response = self.client.get('/api/recipes/?cursor=&search=%20')
+        self.assertEqual(response.status_code, 200)
@@ -0,0 +1,139 @@
+import json
+from io import StringIO
+
+from django.core.management import call_command
+
+from recipes.models import RecipeIngredient, ShoppingListItem
+from recipes.shopping_list import expected_items
+from .base import (FoodgramTestCase, create_ingredients, create_recipe,
+                   create_user)
+
+
+class ShoppingListTest(FoodgramTestCase):
+    """Сводный список покупок совпадает с пересчётом по корзинам"""
+
+    def setUp(self):
+        super().setUp()
+        self.author = create_user('author')
+        self.user = self.login(create_user('buyer'))
+        self.flour, self.milk, self.salt = create_ingredients(
+            'мука', 'молоко', 'соль')
+        self.pancakes = create_recipe(self.author, 'Блины',
+                                      {self.flour: 200, self.milk: 500})
+        self.bread = create_recipe(self.author, 'Хлеб',
+                                   {self.flour: 300, self.salt: 5})
+        for recipe in (self.pancakes, self.bread):
+            self.client.post(f'/api/recipes/{recipe.id}/shopping_cart/')
+
+    def items(self):
+        return {
+            (user_id, ingredient_id): amount
+            for user_id, ingredient_id, amount in
+            ShoppingListItem.objects.values_list(
+                'user_id', 'ingredient_id', 'amount')
+        }
+
+    def assertConsistent(self, **amounts):
+        """Совпадение с пересчётом и количества по именам ингредиентов"""
+        items = self.items()
+        self.assertEqual(items, expected_items())
+        for name, amount in amounts.items():
+            self.assertEqual(
+                items.get((self.user.id, getattr(self, name).id)), amount)
+
+    def test_cart_add_and_remove(self):
+        self.assertConsistent(flour=500, milk=500, salt=5)
+        response = self.client.delete(
+            f'/api/recipes/{self.pancakes.id}/shopping_cart/')
+        self.assertEqual(response.status_code, 204)
+        self.assertConsistent(flour=300, milk=None, salt=5)
+
+    def test_patch_ingredients(self):
+        self.login(self.author)
+        response = self.client.patch(
+            f'/api/recipes/{self.pancakes.id}/',
+            {'ingredients': [{'id': self.flour.id, 'amount': 100},
+                             {'id': self.salt.id, 'amount': 2}]},
+            format='json')
+        self.assertEqual(response.status_code, 200, response.data)
+        self.assertConsistent(flour=400, milk=None, salt=7)
+
+    def test_direct_recipe_ingredient_edit(self):
+        row = RecipeIngredient.objects.get(
+            recipe=self.bread, ingredient=self.salt)
+        row.amount = 8
+        row.save()
+        self.assertConsistent(salt=8)
+        row.ingredient = self.milk
+        row.save()
+        self.assertConsistent(milk=508, salt=None)
+        row.delete()
+        self.assertConsistent(milk=500)
+
+    def test_ingredient_delete(self):
+        self.flour.delete()
+        self.assertConsistent(flour=None, milk=500, salt=5)
+
+    def test_recipe_delete(self):
+        self.bread.delete()
+        self.assertConsistent(flour=200, milk=500, salt=None)
+
+    def test_check_shopping_lists_repairs_drift(self):
+        ShoppingListItem.objects.filter(ingredient=self.flour).update(
+            amount=1)
+        ShoppingListItem.objects.filter(ingredient=self.salt).delete()
+        ShoppingListItem.objects.create(
+            user=self.author, ingredient=self.milk, amount=3)
+        out = StringIO()
+        call_command('check_shopping_lists', '--dry-run', stdout=out)
+        self.assertIn('отсутствовало: 1, лишних: 1, '
+                      'с неверным количеством: 1', out.getvalue())
+        self.assertNotEqual(self.items(), expected_items())
+        call_command('check_shopping_lists', stdout=StringIO())
+        self.assertConsistent(flour=500, milk=500, salt=5)
+
+
+class DownloadShoppingCartTest(FoodgramTestCase):
+    """Список покупок скачивается в txt, csv и json"""
+    url = '/api/recipes/download_shopping_cart/'
+
+    def setUp(self):
+        super().setUp()
+        self.user = self.login(create_user('buyer'))
+        flour, milk = create_ingredients('мука', 'молоко')
+        milk.measurement_unit = 'мл'
+        milk.save()
+        self.recipe = create_recipe(create_user('author'), 'Блины',
+                                    {flour: 200, milk: 500})
+
+    def download(self, file_format):
+        response = self.client.get(f'{self.url}?format={file_format}')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            response['Content-Disposition'],
+            f'attachment; filename="shopping_list.{file_format}"')
+        return b''.join(response.streaming_content).decode()
+
+    def test_formats(self):
+        self.client.post(f'/api/recipes/{self.recipe.id}/shopping_cart/')
+        self.assertEqual(self.download('txt'),
+                         'Cписок покупок:\nмолоко(мл) - 500\nмука(г) - 200')
+        self.assertEqual(
+            self.download('csv'),
+            'name,measurement_unit,amount\r\nмолоко,мл,500\r\nмука,г,200\r\n')
+        self.assertEqual(json.loads(self.download('json')), [
+            {'name': 'молоко', 'measurement_unit': 'мл', 'amount': 500},
+            {'name': 'мука', 'measurement_unit': 'г', 'amount': 200},
+        ])
+
+    def test_empty_cart(self):
+        self.assertEqual(self.download('txt'), 'Cписок покупок:')
+        self.assertEqual(self.download('csv'),
+                         'name,measurement_unit,amount\r\n')
+        self.assertEqual(json.loads(self.download('json')), [])
+
+    def test_accept_header_and_anonymous(self):
+        response = self.client.get(self.url, HTTP_ACCEPT='text/csv')
+        self.assertEqual(response['Content-Type'], 'text/csv; charset=utf-8')
+        self.client.force_authenticate(None)
+        self.assertEqual(self.client.get(self.url).status_code, 401)
@@ -0,0 +1,55 @@
+from datetime import timedelta
+from unittest import mock
+
+from django.test import override_settings
+from django.utils import timezone
+
+from api import slow_queries
+from api.models import SlowQuery
+from .base import FoodgramTestCase, create_user
+
+SELECT = 'SELECT "id" FROM "recipes_recipe" WHERE "id" IN ({}) LIMIT {}'
+
+
+@override_settings(SLOW_QUERY_EXPLAIN_RATE=1)
+class SlowQueryTest(FoodgramTestCase):
+    """Медленные запросы группируются по отпечатку и пишутся в фоне"""
+
+    def test_statements_are_aggregated_by_fingerprint(self):
+        slow_queries.record([
+            (SELECT.format('%s', 10), [1], 0.2),
+            (SELECT.format('%s, %s, %s', 20), [1, 2, 3], 0.5),
+        ], 'recipes-list', 'list')
+        slow_query = SlowQuery.objects.get()
+        self.assertEqual(slow_query.count, 2)
+        self.assertAlmostEqual(slow_query.total_ms, 700)
+        self.assertAlmostEqual(slow_query.max_ms, 500)
+        self.assertEqual(slow_query.view, 'recipes-list')
+        self.assertTrue(slow_query.plan)
+
+    @override_settings(SLOW_QUERY_MAX_ROWS=2, SLOW_QUERY_RETENTION_DAYS=1)
+    def test_old_and_extra_rows_are_pruned(self):
+        for number in range(4):
+            slow_queries.record(
+                [(f'SELECT {number} AS "n{number}"', [], 0.1)], '', '')
+        SlowQuery.objects.filter(sql__contains='n3').update(
+            last_seen=timezone.now() - timedelta(days=2))
+        slow_queries.record([('SELECT 4 AS "n4"', [], 0.1)], '', '')
+        self.assertEqual(
+            sorted(SlowQuery.objects.values_list('sql', flat=True)),
+            ['SELECT 2 AS "n2"', 'SELECT 4 AS "n4"'])
+
+    @override_settings(SLOW_QUERY_THRESHOLD_MS=1e-6)
+    def test_request_records_after_response(self):
+        self.login(create_user('reader'))
+        with mock.patch.object(slow_queries, 'executor') as executor:
+            with self.captureOnCommitCallbacks(execute=True):
+                self.client.get('/api/recipes/')
+                self.assertFalse(executor.submit.called)
+                self.assertFalse(SlowQuery.objects.exists())
+        (function, queries, view, action), _ = executor.submit.call_args
+        self.assertIs(function, slow_queries.record_in_background)
+        self.assertEqual((view, action), ('recipes-list', 'list'))
+        slow_queries.record(queries, view, action)
+        self.assertTrue(SlowQuery.objects.filter(
+            view='recipes-list').exists())
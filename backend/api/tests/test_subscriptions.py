@@ -0,0 +1,23 @@
+from django.utils import timezone
+
+from recipes.models import Recipe
+from users.models import Subscribe
+from .base import FoodgramTestCase, create_recipe, create_user
+
+
+class SubscriptionRecipesLimitTest(FoodgramTestCase):
+    """recipes_limit берёт последние рецепты и при равных датах"""
+
+    def test_equal_pub_date(self):
+        author = create_user('author')
+        Subscribe.objects.create(user=self.login(create_user('reader')),
+                                 author=author)
+        recipes = [create_recipe(author, f'Рецепт {number}')
+                   for number in range(4)]
+        Recipe.objects.update(pub_date=timezone.now())
+        response = self.client.get(
+            '/api/users/subscriptions/?recipes_limit=2')
+        self.assertEqual(
+            [recipe['id'] for recipe in response.data['results'][0][
+                'recipes']],
+            [recipes[3].id, recipes[2].id])
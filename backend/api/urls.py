@@ -4,7 +4,8 @@ from django.urls import path, include
 from api.views import (TagViewSet, RecipeViewSet,
                        IngredientViewSet, FavoriteViewSet,
                        SubscriptionsViewSet, SubscribeViewSet,
-                       SchoppingCartViewSet, DownloadCartViewSet)
+                       SchoppingCartViewSet, DownloadCartViewSet,
+                       RecipeMatchViewSet)
 
 
 routerv1 = routers.DefaultRouter()
@@ -17,12 +18,19 @@ urlpatterns = [
          FavoriteViewSet.as_view({'post': 'create', 'delete': 'delete'}),
          name='favorite'),
     path('users/subscriptions/',
-         SubscriptionsViewSet.as_view({'get': 'list'})),
+         SubscriptionsViewSet.as_view({'get': 'list'}),
+         name='subscriptions'),
     path('users/<users_id>/subscribe/',
-         SubscribeViewSet.as_view({'post': 'create', 'delete': 'delete'})),
+         SubscribeViewSet.as_view({'post': 'create', 'delete': 'delete'}),
+         name='subscribe'),
     path('recipes/<recipes_id>/shopping_cart/',
-         SchoppingCartViewSet.as_view({'post': 'create', 'delete': 'delete'})),
+         SchoppingCartViewSet.as_view({'post': 'create', 'delete': 'delete'}),
+         name='shopping_cart'),
     path('recipes/download_shopping_cart/',
-         DownloadCartViewSet.as_view({'get': 'download'})),
+         DownloadCartViewSet.as_view({'get': 'download'}),
+         name='download_shopping_cart'),
+    path('recipes/match/',
+         RecipeMatchViewSet.as_view({'get': 'list'}),
+         name='recipe_match'),
     path('', include(routerv1.urls))
 ]
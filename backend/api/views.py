@@ -1,57 +1,262 @@
+import csv
+import hashlib
+import json
+from functools import partial
+
 from rest_framework import viewsets
-from django.shortcuts import HttpResponse, get_object_or_404
+from django.http import Http404, StreamingHttpResponse
+from django.shortcuts import get_object_or_404
 from rest_framework import status
+from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
+from rest_framework.exceptions import ValidationError
+from rest_framework.filters import OrderingFilter
+from rest_framework.parsers import FormParser, MultiPartParser
+from rest_framework.renderers import JSONRenderer
 from django_filters.rest_framework import DjangoFilterBackend
-from django.db.models import Sum
+from django.db.models import (BooleanField, Exists, F, OuterRef, Prefetch,
+                              Subquery, Value)
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, quote_etag
 
+from recipes.constants import (MATCHER_MAX_INGREDIENTS,
+                               SHOPPING_LIST_CHUNK_SIZE, SIMILAR_LIMIT,
+                               SIMILAR_TOP_K)
+from recipes.feed import inbox_feed, merged_feed
+from recipes.ingredient_index import get_index
+from recipes.matcher import get_matcher
 from recipes.models import (Tag, Recipe, Ingredient, Favorite,
-                            ShoppingCart, RecipeIngredient)
+                            ShoppingCart, ShoppingListItem,
+                            RecipeSimilarity)
 from users.models import User, Subscribe
 from .serializers import (TagSerializer, RecipeSerializer,
                           RecipeCreateSerializer, IngredientSerializer,
                           FavoriteSerializer, ShortRecipeSerializer,
                           SubscriptionsSerializer, SubscribeSerializer,
                           SchoppingCartSerializer)
-from .pagination import CustomPagination
-from .filters import RecipeFilter
+from .catalogs import ingredient_catalog, tag_catalog
+from .pagination import CustomPagination, FeedPagination, RecipePagination
+from .parsers import LimitedJSONParser
+from .renderers import CSVRenderer, PlainTextRenderer
+from .response_cache import (author_generation, recipe_cache,
+                             recipe_generation)
+from .filters import RecipeFilter, tag_facets
+from .middleware import SerializationTimingMixin
+
+
+def recipe_queryset(request):
+    """Рецепты со всем, что нужно RecipeSerializer"""
+    return Recipe.objects.select_related('author').prefetch_related(
+        'recipeingredient_set__ingredient', 'tags'
+    ).with_user_flags(request.user)
+
+
+def with_limited_recipes(queryset, request):
+    """Авторы с не более чем recipes_limit последними рецептами"""
+    recipes = Recipe.objects.all()
+    recipes_limit = request.query_params.get('recipes_limit')
+    if recipes_limit is not None:
+        if not recipes_limit.isdigit():
+            raise ValidationError(
+                {'recipes_limit': 'Должно быть неотрицательным целым числом'})
+        recipes = recipes.filter(pk__in=Subquery(
+            Recipe.objects.filter(
+                author=OuterRef('author')
+            ).order_by('-pub_date', '-id').values('pk')[:int(recipes_limit)]
+        ))
+    return queryset.prefetch_related(
+        Prefetch('recipes', queryset=recipes, to_attr='limited_recipes')
+    )
 
 
-class IngredientViewSet(viewsets.ModelViewSet):
+class IngredientViewSet(SerializationTimingMixin, viewsets.ModelViewSet):
     """Вьюсет для модели Ingredient"""
     queryset = Ingredient.objects.all()
     serializer_class = IngredientSerializer
+    # Справочник публичный: токен не проверяется, и неверный токен
+    # не превращает ответ в 401
+    authentication_classes = ()
 
+    def list(self, request, *args, **kwargs):
+        name = request.query_params.get('name', '')
+        if not name:
+            return ingredient_catalog.response(request)
+        return Response(get_index().search(name))
 
-class TagViewSet(viewsets.ModelViewSet):
+
+class TagViewSet(SerializationTimingMixin, viewsets.ModelViewSet):
     """Вьюсет для модели Tag"""
     queryset = Tag.objects.all()
     serializer_class = TagSerializer
+    # Справочник публичный: токен не проверяется, как у ингредиентов
+    authentication_classes = ()
+
+    def list(self, request, *args, **kwargs):
+        return tag_catalog.response(request)
 
 
-class RecipeViewSet(viewsets.ModelViewSet):
+class RecipeViewSet(SerializationTimingMixin, viewsets.ModelViewSet):
     """Вьюсет для модели Recipe"""
-    pagination_class = CustomPagination
-    filter_backends = (DjangoFilterBackend,)
+    pagination_class = RecipePagination
+    filter_backends = (DjangoFilterBackend, OrderingFilter)
     filterset_class = RecipeFilter
+    ordering_fields = ('pub_date', 'favorites_count')
+    parser_classes = (LimitedJSONParser, FormParser, MultiPartParser)
     http_method_names = ['get', 'post', 'patch', 'delete']
 
     def get_queryset(self):
-        recipes = Recipe.objects.prefetch_related(
-            'recipeingredient_set__ingredient', 'tags'
-        ).all()
-        return recipes
+        return recipe_queryset(self.request)
+
+    def list(self, request, *args, **kwargs):
+        return recipe_cache.respond(
+            request, ('list',),
+            lambda: self.build_list(request, *args, **kwargs))
+
+    def build_list(self, request, *args, **kwargs):
+        response = super().list(request, *args, **kwargs)
+        if (request.query_params.get('facets') in ('1', 'true')
+                and isinstance(response.data, dict)):
+            response.data['facets'] = tag_facets(request)
+        return response
+
+    def get_version(self, pk):
+        """Дата изменения, автор и флаги пользователя одним запросом"""
+        user = self.request.user
+        is_subscribed = Value(False, output_field=BooleanField())
+        if user.is_authenticated:
+            is_subscribed = Exists(Subscribe.objects.filter(
+                user=user, author=OuterRef('author')))
+        return Recipe.objects.filter(pk=pk).with_user_flags(user).annotate(
+            is_subscribed=is_subscribed
+        ).values_list('updated_at', 'author_id', 'is_favorited',
+                      'is_in_shopping_cart', 'is_subscribed').first()
+
+    def retrieve(self, request, *args, **kwargs):
+        if not kwargs['pk'].isdigit():
+            return super().retrieve(request, *args, **kwargs)
+        pk = int(kwargs['pk'])
+        version = self.get_version(pk)
+        if version is None:
+            raise Http404
+        updated_at, author_id, *flags = version
+        etag = quote_etag(hashlib.md5('{}:{}:{}'.format(
+            pk, updated_at.isoformat(), ''.join(str(int(f)) for f in flags)
+        ).encode()).hexdigest())
+        last_modified = None
+        if not request.user.is_authenticated:
+            last_modified = int(updated_at.timestamp())
+        response = get_conditional_response(
+            request, etag=etag, last_modified=last_modified)
+        if response is None:
+            response = recipe_cache.respond(
+                request, (recipe_generation(pk), author_generation(author_id),
+                          'tags', 'ingredients'),
+                lambda: super(RecipeViewSet, self).retrieve(
+                    request, *args, **kwargs))
+        if response.status_code in (status.HTTP_200_OK,
+                                    status.HTTP_304_NOT_MODIFIED):
+            response['ETag'] = etag
+            if last_modified is not None:
+                response['Last-Modified'] = http_date(last_modified)
+        return response
+
+    def get_similar_limit(self):
+        try:
+            limit = int(self.request.query_params.get('limit', SIMILAR_LIMIT))
+        except ValueError:
+            raise ValidationError({'limit': 'Ожидается целое число'})
+        return max(1, min(limit, SIMILAR_TOP_K))
+
+    @action(detail=True)
+    def similar(self, request, pk=None):
+        """Рецепты, которые добавляют в избранное вместе с этим"""
+        if not pk.isdigit():
+            raise Http404
+        rows = list(RecipeSimilarity.objects.filter(
+            recipe_id=pk
+        ).select_related('similar').only(
+            'score', 'similar__name', 'similar__image',
+            'similar__cooking_time', 'similar__has_renditions'
+        ).order_by('-score')[:self.get_similar_limit()])
+        if not rows:
+            get_object_or_404(Recipe, id=pk)
+        data = self.get_serializer(
+            [row.similar for row in rows], many=True).data
+        for item, row in zip(data, rows):
+            item['score'] = round(row.score, 3)
+        return Response(data)
+
+    @action(detail=False, permission_classes=(IsAuthenticated,))
+    def feed(self, request):
+        """Рецепты авторов из подписок, новые сверху"""
+        user = request.user
+        if user.has_feed_inbox:
+            source = partial(inbox_feed, user)
+        else:
+            request.subscribed_ids = set(Subscribe.objects.filter(
+                user=user).values_list('author_id', flat=True))
+            source = partial(merged_feed, request.subscribed_ids)
+        paginator = FeedPagination()
+        recipe_ids = paginator.paginate_queryset(source, request, self)
+        recipes = self.get_queryset().in_bulk(recipe_ids)
+        recipes = [recipes[recipe_id] for recipe_id in recipe_ids
+                   if recipe_id in recipes]
+        if user.has_feed_inbox:
+            request.subscribed_ids = {recipe.author_id for recipe in recipes}
+        return paginator.get_paginated_response(
+            self.get_serializer(recipes, many=True).data)
 
     def get_serializer_class(self):
-        if self.action in ('list', 'retrieve'):
+        if self.action in ('list', 'retrieve', 'feed'):
             return RecipeSerializer
+        if self.action == 'similar':
+            return ShortRecipeSerializer
         return RecipeCreateSerializer
 
     def perform_create(self, serializer):
         serializer.save(author=self.request.user)
 
 
+class RecipeMatchViewSet(SerializationTimingMixin, viewsets.GenericViewSet):
+    """Рецепты, которые можно приготовить из имеющихся ингредиентов"""
+    serializer_class = RecipeSerializer
+    pagination_class = CustomPagination
+
+    def get_queryset(self):
+        return recipe_queryset(self.request)
+
+    def get_ingredient_ids(self):
+        ingredient_ids = set()
+        for value in self.request.query_params.getlist('ingredients'):
+            try:
+                ingredient_ids.update(
+                    int(part) for part in value.split(',') if part.strip())
+            except ValueError:
+                raise ValidationError(
+                    {'ingredients': 'Ожидаются id ингредиентов через запятую'})
+        if not ingredient_ids:
+            raise ValidationError({'ingredients': 'Укажите ингредиенты'})
+        if len(ingredient_ids) > MATCHER_MAX_INGREDIENTS:
+            raise ValidationError({'ingredients': (
+                f'Не больше {MATCHER_MAX_INGREDIENTS} ингредиентов')})
+        return ingredient_ids
+
+    def list(self, request, *args, **kwargs):
+        ranking = get_matcher().match(self.get_ingredient_ids())
+        page = self.paginate_queryset(ranking)
+        recipes = self.get_queryset().in_bulk(
+            [recipe_id for recipe_id, found, total in page])
+        rows = [(recipes[recipe_id], found, total)
+                for recipe_id, found, total in page if recipe_id in recipes]
+        data = self.get_serializer(
+            [recipe for recipe, found, total in rows], many=True).data
+        for item, (recipe, found, total) in zip(data, rows):
+            item['coverage'] = round(found / total, 3)
+            item['missing'] = total - found
+        return self.get_paginated_response(data)
+
+
 class FavoriteViewSet(viewsets.ModelViewSet):
     """Вьюсет для модели Favorite"""
     queryset = Favorite.objects.all()
@@ -80,13 +285,16 @@ class FavoriteViewSet(viewsets.ModelViewSet):
                         status=status.HTTP_204_NO_CONTENT)
 
 
-class SubscriptionsViewSet(viewsets.ModelViewSet):
+class SubscriptionsViewSet(SerializationTimingMixin, viewsets.ModelViewSet):
     """Вьюсет - мои подписки"""
     serializer_class = SubscriptionsSerializer
     pagination_class = CustomPagination
 
     def get_queryset(self):
-        return User.objects.filter(following__user=self.request.user)
+        return with_limited_recipes(
+            User.objects.filter(following__user=self.request.user),
+            self.request
+        )
 
 
 class SubscribeViewSet(viewsets.ModelViewSet):
@@ -94,7 +302,10 @@ class SubscribeViewSet(viewsets.ModelViewSet):
     permission_classes = (IsAuthenticated,)
 
     def create(self, request, **kwargs):
-        author = get_object_or_404(User, id=kwargs['users_id'])
+        author = get_object_or_404(
+            with_limited_recipes(User.objects.all(), request),
+            id=kwargs['users_id']
+        )
         serializer = SubscribeSerializer(author, data=request.data,
                                          context={"request": request})
         serializer.is_valid(raise_exception=True)
@@ -140,22 +351,63 @@ class SchoppingCartViewSet(viewsets.ModelViewSet):
                         status=status.HTTP_204_NO_CONTENT)
 
 
+class Echo:
+    """Объект с методом write для csv.writer, возвращающий строку"""
+
+    def write(self, value):
+        return value
+
+
 class DownloadCartViewSet(viewsets.ModelViewSet):
     """Вьюсет скачивания списка покупок"""
     permission_classes = (IsAuthenticated,)
+    renderer_classes = (PlainTextRenderer, CSVRenderer, JSONRenderer)
+
+    @staticmethod
+    def as_txt(ingredients):
+        yield 'Cписок покупок:'
+        for ingredient in ingredients:
+            yield (f'\n{ingredient["ingredient__name"]}'
+                   f'({ingredient["ingredient__measurement_unit"]}) - '
+                   f'{ingredient["ingredient_amount"]}')
+
+    @staticmethod
+    def as_csv(ingredients):
+        writer = csv.writer(Echo())
+        yield writer.writerow(('name', 'measurement_unit', 'amount'))
+        for ingredient in ingredients:
+            yield writer.writerow((ingredient['ingredient__name'],
+                                   ingredient['ingredient__measurement_unit'],
+                                   ingredient['ingredient_amount']))
+
+    @staticmethod
+    def as_json(ingredients):
+        yield '['
+        separator = ''
+        for ingredient in ingredients:
+            yield separator + json.dumps({
+                'name': ingredient['ingredient__name'],
+                'measurement_unit': ingredient['ingredient__measurement_unit'],
+                'amount': ingredient['ingredient_amount'],
+            }, ensure_ascii=False)
+            separator = ','
+        yield ']'
 
     def download(self, request):
-        shopping_cart_list = ['Cписок покупок:']
         ingredients = (
-            RecipeIngredient.objects
-            .filter(recipe__shopping_recipe__user=request.user)
-            .values('ingredient__name', 'ingredient__measurement_unit')
-            .annotate(ingredient_amount=Sum('amount'))
+            ShoppingListItem.objects
+            .filter(user=request.user)
+            .values('ingredient__name', 'ingredient__measurement_unit',
+                    ingredient_amount=F('amount'))
+            .order_by('ingredient__name', 'ingredient__measurement_unit')
+            .iterator(chunk_size=SHOPPING_LIST_CHUNK_SIZE)
         )
-        for ingredient in ingredients:
-            name = ingredient['ingredient__name']
-            unit = ingredient['ingredient__measurement_unit']
-            amount = ingredient['ingredient_amount']
-            shopping_cart_list.append(f'\n{name}({unit}) - {amount}')
-        file = HttpResponse(shopping_cart_list, content_type='text/plain')
-        return file
+        renderer = request.accepted_renderer
+        content = getattr(self, f'as_{renderer.format}')(ingredients)
+        response = StreamingHttpResponse(
+            content,
+            content_type=f'{renderer.media_type}; charset=utf-8'
+        )
+        response['Content-Disposition'] = (
+            f'attachment; filename="shopping_list.{renderer.format}"')
+        return response
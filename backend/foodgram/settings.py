@@ -34,6 +34,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'api.middleware.QueryBudgetMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -112,6 +113,14 @@ MEDIA_ROOT = BASE_DIR / 'media'
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
+CACHES = {
+    'default': {
+        'BACKEND': os.getenv('CACHE_BACKEND',
+                             'django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': os.getenv('CACHE_LOCATION', ''),
+    }
+}
+
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
         'rest_framework.authentication.TokenAuthentication',
@@ -130,3 +139,35 @@ DJOSER = {
 }
 
 AUTH_USER_MODEL = 'users.User'
+
+QUERY_BUDGET_PATHS = ('/api/',)
+QUERY_BUDGETS = {
+    'default': {'queries': 20, 'time_ms': 500},
+    ('recipes-list', 'GET'): {'queries': 10, 'time_ms': 300},
+    ('recipes-list', 'POST'): {'queries': 20, 'time_ms': 400},
+    ('recipes-detail', 'GET'): {'queries': 10, 'time_ms': 200},
+    ('recipes-detail', 'PATCH'): {'queries': 25, 'time_ms': 400},
+    ('recipes-detail', 'PUT'): {'queries': 25, 'time_ms': 400},
+    ('recipes-detail', 'DELETE'): {'queries': 20, 'time_ms': 300},
+    ('tags-list', 'GET'): {'queries': 2, 'time_ms': 50},
+    ('tags-detail', 'GET'): {'queries': 2, 'time_ms': 50},
+    ('ingredients-list', 'GET'): {'queries': 2, 'time_ms': 50},
+    ('ingredients-detail', 'GET'): {'queries': 2, 'time_ms': 50},
+    ('subscriptions', 'GET'): {'queries': 8, 'time_ms': 300},
+    ('subscribe', 'POST'): {'queries': 12, 'time_ms': 300},
+    ('subscribe', 'DELETE'): {'queries': 12, 'time_ms': 300},
+    ('favorite', 'POST'): {'queries': 10, 'time_ms': 200},
+    ('favorite', 'DELETE'): {'queries': 10, 'time_ms': 200},
+    ('shopping_cart', 'POST'): {'queries': 12, 'time_ms': 200},
+    ('shopping_cart', 'DELETE'): {'queries': 12, 'time_ms': 200},
+    ('download_shopping_cart', 'GET'): {'queries': 3, 'time_ms': 300},
+    ('recipe_match', 'GET'): {'queries': 8, 'time_ms': 200},
+    ('recipes-similar', 'GET'): {'queries': 2, 'time_ms': 50},
+    ('recipes-feed', 'GET'): {'queries': 8, 'time_ms': 200},
+}
+
+SLOW_QUERY_THRESHOLD_MS = float(os.getenv('SLOW_QUERY_THRESHOLD_MS', 0)) or None
+SLOW_QUERY_EXPLAIN_RATE = float(os.getenv('SLOW_QUERY_EXPLAIN_RATE', 0.1))
+SLOW_QUERY_EXPLAIN_ANALYZE = os.getenv('SLOW_QUERY_EXPLAIN_ANALYZE') == '1'
+SLOW_QUERY_MAX_ROWS = int(os.getenv('SLOW_QUERY_MAX_ROWS', 500))
+SLOW_QUERY_RETENTION_DAYS = int(os.getenv('SLOW_QUERY_RETENTION_DAYS', 30))
@@ -2,7 +2,8 @@ from django.contrib import admin
 from django.contrib.admin import display
 
 from .models import (Tag, Recipe, Ingredient, RecipeIngredient, Favorite,
-                     ShoppingCart)
+                     ShoppingCart, ShoppingListItem, RecipeSimilarity,
+                     SimilarityBuild)
 
 
 @admin.register(Ingredient)
@@ -32,11 +33,13 @@ class RecipeAdmin(admin.ModelAdmin):
         'name',
         'id',
         'author',
-        'added_in_favorites'
+        'added_in_favorites',
+        'in_shopping_cart_count'
     ]
 
     readonly_fields = [
-        'added_in_favorites'
+        'added_in_favorites',
+        'in_shopping_cart_count'
     ]
 
     list_filter = [
@@ -45,9 +48,10 @@ class RecipeAdmin(admin.ModelAdmin):
         'tags'
     ]
 
-    @display(description='Количество в избранных')
+    @display(description='Количество в избранных',
+             ordering='favorites_count')
     def added_in_favorites(self, obj):
-        return obj.favorite.count()
+        return obj.favorites_count
 
 
 @admin.register(RecipeIngredient)
@@ -73,3 +77,37 @@ class ShoppingCartAdmin(admin.ModelAdmin):
         'user',
         'recipe'
     ]
+
+
+@admin.register(ShoppingListItem)
+class ShoppingListItemAdmin(admin.ModelAdmin):
+    list_display = [
+        'user',
+        'ingredient',
+        'amount'
+    ]
+
+
+@admin.register(RecipeSimilarity)
+class RecipeSimilarityAdmin(admin.ModelAdmin):
+    list_display = [
+        'recipe',
+        'similar',
+        'score'
+    ]
+    raw_id_fields = [
+        'recipe',
+        'similar'
+    ]
+
+
+@admin.register(SimilarityBuild)
+class SimilarityBuildAdmin(admin.ModelAdmin):
+    list_display = [
+        'created_at',
+        'full',
+        'with_cart',
+        'recipes',
+        'duration',
+        'memory'
+    ]
@@ -0,0 +1,74 @@
+"""Изменения состава рецептов, откуда бы они ни пришли.
+
+Сигналы RecipeIngredient записывают приращения количества по
+ингредиентам, а сводные списки покупок и дата изменения рецепта
+обновляются по ним сразу или одним проходом на рецепт внутри collect(). Массовые bulk_create и
+bulk_update сигналов не отправляют, поэтому их вызывающий записывает
+приращения сам через record().
+"""
+from collections import defaultdict
+from contextlib import contextmanager
+from threading import local
+
+from django.utils import timezone
+
+from . import shopping_list
+from .models import Recipe
+
+
+class State(local):
+
+    def __init__(self):
+        self.changes = None
+        self.deleting = set()
+
+
+_state = State()
+
+
+def apply(changes):
+    if not changes:
+        return
+    for recipe_id, deltas in changes.items():
+        shopping_list.change_recipe(recipe_id, deltas)
+    Recipe.objects.filter(pk__in=list(changes)).update(
+        updated_at=timezone.now())
+
+
+@contextmanager
+def collect():
+    """Копить приращения и применить их один раз на рецепт"""
+    if _state.changes is not None:
+        yield
+        return
+    _state.changes = defaultdict(lambda: defaultdict(int))
+    try:
+        yield
+        changes = _state.changes
+    finally:
+        _state.changes = None
+    apply(changes)
+
+
+def record(recipe_id, deltas):
+    """Приращения {ingredient_id: delta} состава рецепта"""
+    if recipe_id in _state.deleting:
+        return
+    if _state.changes is None:
+        apply({recipe_id: deltas})
+        return
+    for ingredient_id, delta in deltas.items():
+        _state.changes[recipe_id][ingredient_id] += delta
+
+
+def start_deleting(recipe_id):
+    """Рецепт удаляется целиком, его корзины уберёт сигнал ShoppingCart.
+
+    Сигналы pre_delete каскада приходят раньше любых удалений, поэтому
+    удаление строк состава после этого не должно вычитаться ещё раз.
+    """
+    _state.deleting.add(recipe_id)
+
+
+def finish_deleting(recipe_id):
+    _state.deleting.discard(recipe_id)
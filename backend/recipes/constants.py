@@ -6,3 +6,34 @@ MAX_AMOUNT: int = 10000
 
 USERNAME_NAME: int = 150
 EMAIL: int = 254
+
+INGREDIENT_INDEX_TTL: int = 300
+CATALOG_CACHE_TTL: int = 300
+CATALOG_MAX_AGE: int = 60
+SHOPPING_LIST_CHUNK_SIZE: int = 500
+MAX_PAGE_SIZE: int = 100
+FACETS_CACHE_TTL: int = 30
+IMAGE_RENDITIONS: dict = {'card': (480, 480), 'detail': (1200, 1200)}
+IMAGE_RENDITION_FORMAT: str = 'WEBP'
+IMAGE_RENDITION_QUALITY: int = 80
+IMAGE_ORIGINAL_SIZE: tuple = (2048, 2048)
+IMAGE_ORIGINAL_QUALITY: int = 85
+IMAGE_WORKERS: int = 2
+MAX_RECIPE_BODY_SIZE: int = 10 * 1024 * 1024
+IMAGE_DECODE_CHUNK_SIZE: int = 64 * 1024
+IMAGE_SPOOL_SIZE: int = 1024 * 1024
+MAX_IMAGE_SIDE: int = 6000
+MAX_IMAGE_PIXELS: int = 24_000_000
+RESPONSE_CACHE_TTL: int = 300
+MATCHER_INDEX_TTL: int = 3600
+MATCHER_SYNC_OVERLAP: int = 60
+MATCHER_DELETED_TTL: int = 24 * 3600
+MATCHER_MAX_INGREDIENTS: int = 50
+SIMILAR_TOP_K: int = 20
+SIMILAR_LIMIT: int = 6
+SIMILAR_CART_WEIGHT: float = 0.5
+SIMILAR_MAX_USER_ITEMS: int = 500
+SIMILAR_WRITE_CHUNK: int = 1000
+FEED_MERGE_BATCH: int = 200
+FEED_INBOX_CHUNK: int = 1000
+FEED_INBOX_MIN_FOLLOWING: int = 1000
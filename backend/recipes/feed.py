@@ -0,0 +1,122 @@
+"""Лента рецептов авторов, на которых подписан пользователь.
+
+Обычно лента собирается слиянием: для каждого автора берётся не больше
+limit рецептов после курсора по индексу (author, -pub_date, -id), части
+объединяются UNION ALL и сортируются базой, а пачки авторов сливаются
+heapq.merge. Тем, кто подписан на тысячи авторов, можно включить входящие:
+рецепт копируется подписчикам при публикации, и лента читается одним
+диапазоном индекса (user, -pub_date, -recipe).
+"""
+from heapq import merge
+from itertools import islice
+
+from django.db import connection
+from django.db.models import Q
+
+from users.models import Subscribe
+from .constants import FEED_INBOX_CHUNK, FEED_MERGE_BATCH
+from .models import FeedItem, Recipe
+
+
+def after(position, date_field, id_field, newer=False):
+    """Условие курсора: строго раньше (pub_date, id) записи или позже"""
+    pub_date, recipe_id = position
+    lookup = 'gt' if newer else 'lt'
+    return (Q(**{f'{date_field}__{lookup}': pub_date})
+            | Q(**{date_field: pub_date, f'{id_field}__{lookup}': recipe_id}))
+
+
+def converters():
+    column = Recipe._meta.get_field('pub_date').get_col(
+        Recipe._meta.db_table)
+    return [(converter, column) for converter in (
+        connection.ops.get_db_converters(column)
+        + column.get_db_converters(connection))]
+
+
+def author_range_sql(position):
+    """SQL диапазона одного автора с параметрами: автор, курсор, limit"""
+    quote = connection.ops.quote_name
+    options = Recipe._meta
+    pub_date = quote(options.get_field('pub_date').column)
+    recipe_id = quote(options.pk.column)
+    where = f'{quote(options.get_field("author").column)} = %s'
+    if position is not None:
+        where += (f' AND ({pub_date} < %s '
+                  f'OR ({pub_date} = %s AND {recipe_id} < %s))')
+    return (f'SELECT {pub_date}, {recipe_id} '
+            f'FROM {quote(options.db_table)} WHERE {where} '
+            f'ORDER BY {pub_date} DESC, {recipe_id} DESC LIMIT %s')
+
+
+def merge_batch(author_ids, position, limit):
+    """Первые limit пар (pub_date, id) пачки авторов одним запросом.
+
+    SQL части для одного автора собирается один раз без ORM: компиляция
+    запроса для каждого из сотен авторов дольше, чем выполнение всего
+    UNION ALL. Параметры частей перечисляются явно в порядке их %s.
+    """
+    sql = author_range_sql(position)
+    cursor_params = []
+    if position is not None:
+        pub_date = connection.ops.adapt_datetimefield_value(position[0])
+        cursor_params = [pub_date, pub_date, position[1]]
+    parts = [f'SELECT * FROM ({sql}) a{number}'
+             for number in range(len(author_ids))]
+    params = [param for author_id in author_ids
+              for param in (author_id, *cursor_params, limit)]
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'SELECT * FROM ({" UNION ALL ".join(parts)}) feed '
+            f'ORDER BY 1 DESC, 2 DESC LIMIT %s', [*params, limit])
+        rows = cursor.fetchall()
+    for converter, column in converters():
+        rows = [(converter(pub_date, column, connection), recipe_id)
+                for pub_date, recipe_id in rows]
+    return rows
+
+
+def merged_feed(author_ids, position, limit):
+    """Слияние диапазонов авторов по убыванию (pub_date, id)"""
+    author_ids = sorted(author_ids)
+    batches = [
+        merge_batch(author_ids[start:start + FEED_MERGE_BATCH],
+                    position, limit)
+        for start in range(0, len(author_ids), FEED_MERGE_BATCH)
+    ]
+    return list(islice(merge(*batches, reverse=True), limit))
+
+
+def inbox_feed(user, position, limit):
+    items = FeedItem.objects.filter(user=user)
+    if position is not None:
+        items = items.filter(after(position, 'pub_date', 'recipe_id'))
+    return list(items.order_by('-pub_date', '-recipe_id').values_list(
+        'pub_date', 'recipe_id')[:limit])
+
+
+def fill_inbox(user_id, author_ids=None):
+    """Скопировать во входящие уже опубликованные рецепты подписок"""
+    recipes = Recipe.objects.filter(author__following__user_id=user_id)
+    if author_ids is not None:
+        recipes = recipes.filter(author_id__in=author_ids)
+    rows = recipes.values_list('id', 'pub_date').iterator(
+        chunk_size=FEED_INBOX_CHUNK)
+    while True:
+        items = [FeedItem(user_id=user_id, recipe_id=recipe_id,
+                          pub_date=pub_date)
+                 for recipe_id, pub_date in islice(rows, FEED_INBOX_CHUNK)]
+        if not items:
+            break
+        FeedItem.objects.bulk_create(items, ignore_conflicts=True)
+
+
+def fan_out(recipe):
+    """Разложить новый рецепт по входящим подписчиков автора"""
+    user_ids = Subscribe.objects.filter(
+        author_id=recipe.author_id, user__has_feed_inbox=True
+    ).values_list('user_id', flat=True)
+    FeedItem.objects.bulk_create(
+        [FeedItem(user_id=user_id, recipe=recipe, pub_date=recipe.pub_date)
+         for user_id in user_ids],
+        batch_size=FEED_INBOX_CHUNK, ignore_conflicts=True)
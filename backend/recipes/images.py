@@ -0,0 +1,131 @@
+"""Уменьшенные копии картинок рецептов в компактном формате.
+
+Сам загруженный файл тоже уменьшается до IMAGE_ORIGINAL_SIZE и
+сохраняется без метаданных под тем же именем.
+"""
+import io
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import PurePosixPath
+
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import connection, transaction
+from django.dispatch import Signal
+from django.utils import timezone
+from PIL import Image, ImageOps
+
+from .constants import (IMAGE_ORIGINAL_QUALITY, IMAGE_ORIGINAL_SIZE,
+                        IMAGE_RENDITION_FORMAT, IMAGE_RENDITION_QUALITY,
+                        IMAGE_RENDITIONS, IMAGE_WORKERS)
+from .models import Recipe
+
+logger = logging.getLogger('recipes.images')
+executor = ThreadPoolExecutor(max_workers=IMAGE_WORKERS,
+                              thread_name_prefix='renditions')
+# Копии готовы, аргумент recipe_ids - рецепты с этой картинкой
+renditions_ready = Signal()
+
+
+def rendition_name(image_name, rendition):
+    path = PurePosixPath(image_name)
+    name = f'{path.stem}_{rendition}.{IMAGE_RENDITION_FORMAT.lower()}'
+    return str(path.parent / 'renditions' / name)
+
+
+def replace_file(name, content):
+    if default_storage.exists(name):
+        default_storage.delete(name)
+    default_storage.save(name, ContentFile(content))
+
+
+def normalize_original(image_name, image, image_format, has_metadata):
+    """Пересохранить большой или с метаданными оригинал под тем же именем.
+
+    Анимированные GIF не трогаются, уже обработанный файл не сжимается
+    повторно.
+    """
+    too_big = (image.width > IMAGE_ORIGINAL_SIZE[0]
+               or image.height > IMAGE_ORIGINAL_SIZE[1])
+    if image_format == 'GIF' or not (too_big or has_metadata):
+        return
+    original = image.copy()
+    original.thumbnail(IMAGE_ORIGINAL_SIZE, Image.LANCZOS)
+    if image_format == 'JPEG' and original.mode != 'RGB':
+        original = original.convert('RGB')
+    buffer = io.BytesIO()
+    original.save(buffer, image_format, quality=IMAGE_ORIGINAL_QUALITY,
+                  optimize=True)
+    replace_file(image_name, buffer.getvalue())
+
+
+def make_renditions(image_name):
+    """Создать все копии картинки и отметить рецепты, где она используется"""
+    with default_storage.open(image_name) as file:
+        source = Image.open(file)
+        image_format = source.format
+        has_metadata = bool(source.getexif()) or 'icc_profile' in source.info
+        image = ImageOps.exif_transpose(source)
+        image.load()
+    if image.mode not in ('RGB', 'RGBA'):
+        image = image.convert('RGBA' if 'A' in image.getbands() else 'RGB')
+    normalize_original(image_name, image, image_format, has_metadata)
+    for rendition, size in IMAGE_RENDITIONS.items():
+        copy = image.copy()
+        copy.thumbnail(size, Image.LANCZOS)
+        buffer = io.BytesIO()
+        copy.save(buffer, IMAGE_RENDITION_FORMAT,
+                  quality=IMAGE_RENDITION_QUALITY)
+        replace_file(rendition_name(image_name, rendition),
+                     buffer.getvalue())
+    recipes = Recipe.objects.filter(image=image_name)
+    recipe_ids = list(recipes.values_list('pk', flat=True))
+    updated = recipes.update(has_renditions=True,
+                             updated_at=timezone.now())
+    renditions_ready.send(sender=Recipe, recipe_ids=recipe_ids)
+    return updated
+
+
+def process_in_background(image_name):
+    try:
+        make_renditions(image_name)
+    except Exception:
+        logger.exception('Не удалось обработать картинку %s', image_name)
+    finally:
+        connection.close()
+
+
+def schedule_renditions(image_name):
+    """Поставить картинку в очередь после фиксации транзакции"""
+    if not image_name:
+        return
+    transaction.on_commit(
+        lambda: executor.submit(process_in_background, image_name))
+
+
+def delete_image(image_name):
+    """Удалить оригинал и копии, если картинка больше ни в одном рецепте"""
+    if Recipe.objects.filter(image=image_name).exists():
+        return
+    for name in (image_name, *(rendition_name(image_name, rendition)
+                               for rendition in IMAGE_RENDITIONS)):
+        default_storage.delete(name)
+
+
+def schedule_deletion(image_name):
+    """Удалить файлы картинки после фиксации транзакции"""
+    if not image_name:
+        return
+    transaction.on_commit(lambda: delete_image(image_name))
+
+
+def rendition_urls(recipe):
+    if not recipe.image:
+        return None
+    if not recipe.has_renditions:
+        return {rendition: recipe.image.url for rendition in IMAGE_RENDITIONS}
+    return {
+        rendition: default_storage.url(
+            rendition_name(recipe.image.name, rendition))
+        for rendition in IMAGE_RENDITIONS
+    }
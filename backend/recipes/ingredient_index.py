@@ -0,0 +1,73 @@
+"""Индекс ингредиентов в памяти процесса для автодополнения"""
+import time
+from bisect import bisect_left
+from threading import Lock
+
+from django.core.cache import cache
+
+from .constants import INGREDIENT_INDEX_TTL
+from .models import Ingredient
+
+VERSION_KEY = 'ingredient_index:version'
+
+_index = None
+_version = None
+_built_at = 0.0
+_lock = Lock()
+
+
+def normalize(value):
+    """Ключ поиска без учёта регистра, в том числе для кириллицы"""
+    return value.casefold().replace('ё', 'е')
+
+
+class IngredientIndex:
+    """Отсортированный по названию список ингредиентов"""
+
+    def __init__(self, rows):
+        items = sorted(
+            ({'id': pk, 'name': name, 'measurement_unit': unit}
+             for pk, name, unit in rows),
+            key=lambda item: (normalize(item['name']), item['id'])
+        )
+        self.keys = [normalize(item['name']) for item in items]
+        self.items = items
+
+    def search(self, query):
+        """Сначала совпадения по началу названия, затем по подстроке"""
+        query = normalize(query.strip())
+        if not query:
+            return list(self.items)
+        start = end = bisect_left(self.keys, query)
+        while end < len(self.keys) and self.keys[end].startswith(query):
+            end += 1
+        substring = [
+            self.items[position]
+            for position, key in enumerate(self.keys)
+            if query in key and not start <= position < end
+        ]
+        return self.items[start:end] + substring
+
+
+def get_index():
+    """Индекс процесса, пересобирается по TTL и после смены версии в кэше"""
+    global _index, _version, _built_at
+    version = cache.get_or_set(VERSION_KEY, 0, None)
+    with _lock:
+        if (_index is None or _version != version
+                or time.monotonic() - _built_at > INGREDIENT_INDEX_TTL):
+            _index = IngredientIndex(Ingredient.objects.values_list(
+                'id', 'name', 'measurement_unit'))
+            _version, _built_at = version, time.monotonic()
+        return _index
+
+
+def invalidate_index(**kwargs):
+    """Сбросить индекс во всех процессах через версию в общем кэше"""
+    global _index
+    try:
+        cache.incr(VERSION_KEY)
+    except ValueError:
+        cache.set(VERSION_KEY, 1, None)
+    with _lock:
+        _index = None
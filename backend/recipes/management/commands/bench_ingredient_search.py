@@ -0,0 +1,45 @@
+from statistics import mean, quantiles
+from time import perf_counter
+
+from django.core.management.base import BaseCommand
+
+from recipes.ingredient_index import IngredientIndex, get_index
+from recipes.models import Ingredient
+
+
+class Command(BaseCommand):
+    """Сравнение поиска ингредиентов по индексу и через icontains"""
+
+    def add_arguments(self, parser):
+        parser.add_argument('--repeat', type=int, default=20)
+        parser.add_argument('queries', nargs='*')
+
+    def measure(self, search, queries, repeat):
+        timings = []
+        for _ in range(repeat):
+            for query in queries:
+                start = perf_counter()
+                search(query)
+                timings.append((perf_counter() - start) * 1e6)
+        cut_points = quantiles(timings, n=20)
+        return mean(timings), cut_points[9], cut_points[18]
+
+    def handle(self, *args, **options):
+        queries = options['queries'] or ['а', 'мо', 'сыр', 'курин', 'соль']
+        start = perf_counter()
+        IngredientIndex(Ingredient.objects.values_list(
+            'id', 'name', 'measurement_unit'))
+        self.stdout.write(
+            f'Построение индекса: {(perf_counter() - start) * 1e3:.1f} мс')
+        index = get_index()
+        results = {
+            'index': self.measure(index.search, queries, options['repeat']),
+            'icontains': self.measure(
+                lambda query: list(Ingredient.objects.filter(
+                    name__icontains=query).values(
+                    'id', 'name', 'measurement_unit')),
+                queries, options['repeat']),
+        }
+        for name, (avg, p50, p95) in results.items():
+            self.stdout.write(f'{name:>10}: среднее {avg:9.1f} мкс, '
+                              f'p50 {p50:9.1f} мкс, p95 {p95:9.1f} мкс')
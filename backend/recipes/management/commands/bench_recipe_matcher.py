@@ -0,0 +1,67 @@
+import random
+import tracemalloc
+from statistics import quantiles
+from time import perf_counter
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Count, ExpressionWrapper, F, FloatField, Q
+
+from recipes.matcher import build
+from recipes.models import Recipe, RecipeIngredient
+
+
+class Command(BaseCommand):
+    """Подбор рецептов по набору ингредиентов: индекс против SQL"""
+
+    def add_arguments(self, parser):
+        parser.add_argument('--repeat', type=int, default=50)
+        parser.add_argument('--set-size', type=int, default=10)
+        parser.add_argument('--skip-sql', action='store_true',
+                            help='Не замерять запрос к базе')
+        parser.add_argument('--seed', type=int, default=42)
+
+    def measure(self, search, sets):
+        timings = []
+        for ingredient_ids in sets:
+            start = perf_counter()
+            search(ingredient_ids)
+            timings.append((perf_counter() - start) * 1e3)
+        cut_points = quantiles(timings, n=20)
+        return cut_points[9], cut_points[18]
+
+    def sql_search(self, ingredient_ids):
+        return list(RecipeIngredient.objects.values('recipe').annotate(
+            total=Count('id'),
+            found=Count('id', filter=Q(ingredient__in=ingredient_ids)),
+        ).filter(found__gt=0).annotate(coverage=ExpressionWrapper(
+            F('found') * 1.0 / F('total'), output_field=FloatField()
+        )).order_by('-coverage', 'total', '-recipe')[:10])
+
+    def handle(self, *args, **options):
+        rng = random.Random(options['seed'])
+        if options['repeat'] < 2:
+            raise CommandError('--repeat должен быть не меньше 2')
+        total = Recipe.objects.count()
+        if not total:
+            raise CommandError('Нет данных, запустите generate_data')
+        start = perf_counter()
+        build()
+        elapsed = perf_counter() - start
+        tracemalloc.start()
+        matcher = build()
+        memory = tracemalloc.get_traced_memory()[0] / 1024 / 1024
+        tracemalloc.stop()
+        self.stdout.write(
+            f'Рецептов: {total}, '
+            f'построение {elapsed:.1f} с, память {memory:.1f} МБ')
+        ingredient_ids = list(matcher.postings)
+        sets = [rng.sample(ingredient_ids,
+                           min(options['set_size'], len(ingredient_ids)))
+                for _ in range(options['repeat'])]
+        p50, p95 = self.measure(lambda ids: matcher.match(ids)[:10], sets)
+        self.stdout.write(f'{"index":>6}: p50 {p50:8.2f} мс, '
+                          f'p95 {p95:8.2f} мс')
+        if not options['skip_sql']:
+            p50, p95 = self.measure(self.sql_search, sets[:3])
+            self.stdout.write(f'{"sql":>6}: p50 {p50:8.2f} мс, '
+                              f'p95 {p95:8.2f} мс')
@@ -0,0 +1,67 @@
+import resource
+from time import perf_counter
+
+from django.core.management.base import BaseCommand, CommandError
+
+from recipes.constants import (SIMILAR_CART_WEIGHT, SIMILAR_MAX_USER_ITEMS,
+                               SIMILAR_TOP_K)
+from recipes.models import SimilarityBuild
+from recipes.similarity import changed_recipes, last_ids, load, store
+
+
+class Command(BaseCommand):
+    """Похожие рецепты по совместному добавлению в избранное"""
+    help = ('Строит похожие рецепты. Без --full пересчитываются только '
+            'рецепты с новыми записями и рецепты тех же пользователей: '
+            'строки остальных рецептов, сходство которых сдвинулось из-за '
+            'изменившейся нормы соседа, и удалённые записи учитывает только '
+            'полное построение, его стоит запускать по расписанию.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--full', action='store_true',
+                            help='Пересчитать все рецепты, а не изменённые, '
+                                 'с учётом удалений и сдвига норм')
+        parser.add_argument('--with-cart', action='store_true',
+                            help='Учитывать корзину покупок')
+        parser.add_argument('--cart-weight', type=float,
+                            default=SIMILAR_CART_WEIGHT)
+        parser.add_argument('--top-k', type=int, default=SIMILAR_TOP_K)
+        parser.add_argument('--max-user-items', type=int,
+                            default=SIMILAR_MAX_USER_ITEMS,
+                            help='Сколько последних рецептов пользователя '
+                                 'учитывать')
+
+    def handle(self, *args, **options):
+        if options['top_k'] < 1 or options['max_user_items'] < 1:
+            raise CommandError('--top-k и --max-user-items должны быть '
+                               'больше нуля')
+        start = perf_counter()
+        with_cart = options['with_cart']
+        previous = SimilarityBuild.objects.first()
+        full = (options['full'] or previous is None
+                or previous.with_cart != with_cart)
+        last_favorite_id, last_cart_id = last_ids(with_cart)
+        if not full and (previous.last_favorite_id,
+                         previous.last_cart_id) == (last_favorite_id,
+                                                    last_cart_id):
+            self.stdout.write('Новых записей нет')
+            return
+        matrix = load(with_cart, options['max_user_items'],
+                      options['cart_weight'])
+        if full:
+            recipe_ids = matrix.recipe_ids()
+        else:
+            recipe_ids = changed_recipes(matrix, previous)
+        store(matrix, recipe_ids, options['top_k'], full=full)
+        duration = perf_counter() - start
+        memory = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+        SimilarityBuild.objects.create(
+            full=full, with_cart=with_cart,
+            last_favorite_id=last_favorite_id, last_cart_id=last_cart_id,
+            recipes=len(recipe_ids), duration=duration, memory=memory)
+        self.stdout.write(self.style.SUCCESS(
+            f'{"Полное" if full else "Инкрементальное"} построение: '
+            f'пользователей {len(matrix.users)}, '
+            f'рецептов {len(recipe_ids)}, '
+            f'время {duration:.2f} с, пик памяти процесса {memory:.1f} МБ'
+        ))
@@ -0,0 +1,58 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from recipes.models import ShoppingListItem
+from recipes.shopping_list import expected_items
+
+
+class Command(BaseCommand):
+    """Пересборка сводных списков покупок с отчётом о расхождениях"""
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dry-run', action='store_true',
+                            help='Только показать расхождения')
+
+    def report(self, missing, extra, wrong, expected, actual):
+        for user_id, ingredient_id in sorted(missing):
+            self.stdout.write(f'нет строки: user={user_id} '
+                              f'ingredient={ingredient_id}')
+        for user_id, ingredient_id in sorted(extra):
+            self.stdout.write(f'лишняя строка: user={user_id} '
+                              f'ingredient={ingredient_id}')
+        for user_id, ingredient_id in sorted(wrong):
+            self.stdout.write(
+                f'неверное количество: user={user_id} '
+                f'ingredient={ingredient_id} '
+                f'{actual[(user_id, ingredient_id)]} вместо '
+                f'{expected[(user_id, ingredient_id)]}')
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            expected = expected_items()
+            actual = {
+                (user_id, ingredient_id): amount
+                for user_id, ingredient_id, amount in (
+                    ShoppingListItem.objects.select_for_update().values_list(
+                        'user_id', 'ingredient_id', 'amount'))
+            }
+            missing = expected.keys() - actual.keys()
+            extra = actual.keys() - expected.keys()
+            wrong = [key for key in expected.keys() & actual.keys()
+                     if expected[key] != actual[key]]
+            if options['verbosity']:
+                self.report(missing, extra, wrong, expected, actual)
+            if not options['dry_run']:
+                ShoppingListItem.objects.all().delete()
+                ShoppingListItem.objects.bulk_create(
+                    (ShoppingListItem(user_id=user_id,
+                                      ingredient_id=ingredient_id,
+                                      amount=amount)
+                     for (user_id, ingredient_id), amount in expected.items()),
+                    batch_size=1000
+                )
+        style = self.style.WARNING if missing or extra or wrong \
+            else self.style.SUCCESS
+        self.stdout.write(style(
+            f'Строк: {len(expected)}, отсутствовало: {len(missing)}, '
+            f'лишних: {len(extra)}, с неверным количеством: {len(wrong)}'
+        ))
@@ -0,0 +1,47 @@
+from time import perf_counter
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Count
+
+from recipes.constants import FEED_INBOX_MIN_FOLLOWING
+from recipes.feed import fill_inbox
+from recipes.models import FeedItem
+from users.models import User
+
+
+class Command(BaseCommand):
+    """Входящие ленты для тех, кто подписан на много авторов"""
+
+    def add_arguments(self, parser):
+        parser.add_argument('--min-following', type=int,
+                            default=FEED_INBOX_MIN_FOLLOWING,
+                            help='С какого числа подписок включать входящие')
+        parser.add_argument('--rebuild', action='store_true',
+                            help='Перезаполнить уже включённые входящие')
+
+    def handle(self, *args, **options):
+        start = perf_counter()
+        users = User.objects.annotate(following_count=Count('follower'))
+        heavy = users.filter(following_count__gte=options['min_following'])
+        enable = heavy.filter(has_feed_inbox=False)
+        if options['rebuild']:
+            enable = heavy
+        disable = users.filter(has_feed_inbox=True,
+                               following_count__lt=options['min_following'])
+        disabled = 0
+        for user_id in disable.values_list('id', flat=True):
+            with transaction.atomic():
+                User.objects.filter(pk=user_id).update(has_feed_inbox=False)
+                FeedItem.objects.filter(user_id=user_id).delete()
+            disabled += 1
+        enabled = 0
+        for user_id in enable.values_list('id', flat=True):
+            with transaction.atomic():
+                User.objects.filter(pk=user_id).update(has_feed_inbox=True)
+                fill_inbox(user_id)
+            enabled += 1
+        self.stdout.write(self.style.SUCCESS(
+            f'Входящие включены: {enabled}, выключены: {disabled}, '
+            f'время: {perf_counter() - start:.2f} с'
+        ))
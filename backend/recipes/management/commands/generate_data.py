@@ -0,0 +1,143 @@
+import random
+from itertools import accumulate
+from time import perf_counter
+
+from django.contrib.auth.hashers import make_password
+from django.core.management import call_command
+from django.core.management.base import BaseCommand
+
+from recipes.constants import MAX_LENGHT
+from recipes.models import (Favorite, Ingredient, Recipe, RecipeIngredient,
+                            ShoppingCart, Tag)
+from users.models import Subscribe, User
+
+TAG_NAMES = ('Завтрак', 'Обед', 'Ужин', 'Десерт', 'Выпечка', 'Суп',
+             'Салат', 'Напиток')
+
+
+def zipf_weights(size, exponent):
+    """Накопленные веса, при которых первые элементы намного популярнее"""
+    return list(accumulate(1 / rank ** exponent for rank in range(1, size + 1)))
+
+
+class Command(BaseCommand):
+    """Синтетические данные для нагрузочных замеров"""
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=1000)
+        parser.add_argument('--recipes', type=int, default=10000)
+        parser.add_argument('--ingredients-per-recipe', type=int, default=8)
+        parser.add_argument('--favorites-per-user', type=int, default=20)
+        parser.add_argument('--cart-per-user', type=int, default=5)
+        parser.add_argument('--subscriptions-per-user', type=int, default=10)
+        parser.add_argument('--skew', type=float, default=1.1,
+                            help='Показатель распределения Ципфа')
+        parser.add_argument('--batch-size', type=int, default=5000)
+        parser.add_argument('--seed', type=int, default=42)
+
+    def bulk(self, model, objects):
+        model.objects.bulk_create(objects, batch_size=self.batch_size,
+                                  ignore_conflicts=True)
+
+    def handle(self, *args, **options):
+        start = perf_counter()
+        rng = random.Random(options['seed'])
+        self.batch_size = options['batch_size']
+        if not Ingredient.objects.exists():
+            call_command('load_cvs_data', stdout=self.stdout)
+        ingredient_ids = list(Ingredient.objects.values_list('id', flat=True))
+        ingredient_names = list(
+            Ingredient.objects.values_list('name', flat=True))
+        self.bulk(Tag, [
+            Tag(name=name, color=f'#{rng.randrange(0x1000000):06X}',
+                slug=f'tag{number}')
+            for number, name in enumerate(TAG_NAMES)
+        ])
+        tag_ids = list(Tag.objects.values_list('id', flat=True))
+
+        first_user = User.objects.order_by('-id').values_list(
+            'id', flat=True).first() or 0
+        password = make_password(None)
+        self.bulk(User, [
+            User(username=f'user{first_user + number}',
+                 email=f'user{first_user + number}@example.com',
+                 first_name='Имя', last_name='Фамилия', password=password)
+            for number in range(options['users'])
+        ])
+        user_ids = list(User.objects.filter(
+            id__gt=first_user).values_list('id', flat=True))
+        authors = zipf_weights(len(user_ids), options['skew'])
+
+        recipe_ids = []
+        remaining = options['recipes']
+        while remaining:
+            size = min(remaining, self.batch_size)
+            last_recipe = Recipe.objects.order_by('-id').values_list(
+                'id', flat=True).first() or 0
+            self.bulk(Recipe, [
+                Recipe(name=f'{rng.choice(ingredient_names).capitalize()} '
+                            f'с {rng.choice(ingredient_names)}'[:MAX_LENGHT],
+                       text=f'Рецепт {last_recipe + number + 1}: '
+                            f'{", ".join(rng.sample(ingredient_names, 5))}',
+                       image='',
+                       cooking_time=rng.randint(5, 180),
+                       author_id=rng.choices(user_ids, cum_weights=authors)[0])
+                for number in range(size)
+            ])
+            batch = list(Recipe.objects.filter(
+                id__gt=last_recipe).values_list('id', flat=True))
+            self.bulk(Recipe.tags.through, [
+                Recipe.tags.through(recipe_id=recipe_id, tag_id=tag_id)
+                for recipe_id in batch
+                for tag_id in rng.sample(tag_ids, rng.randint(1, 3))
+            ])
+            self.bulk(RecipeIngredient, [
+                RecipeIngredient(recipe_id=recipe_id, ingredient_id=pk,
+                                 amount=rng.randint(1, 500))
+                for recipe_id in batch
+                for pk in rng.sample(ingredient_ids, max(1, min(
+                    len(ingredient_ids), int(rng.gauss(
+                        options['ingredients_per_recipe'], 3)))))
+            ])
+            recipe_ids += batch
+            remaining -= size
+            self.stdout.write(f'Рецептов: {len(recipe_ids)}')
+
+        popular = zipf_weights(len(recipe_ids), options['skew'])
+        for model, per_user in ((Favorite, options['favorites_per_user']),
+                                (ShoppingCart, options['cart_per_user'])):
+            objects = []
+            for user_id in user_ids:
+                count = min(len(recipe_ids),
+                            int(rng.expovariate(1 / per_user)))
+                objects += [
+                    model(user_id=user_id, recipe_id=recipe_id)
+                    for recipe_id in set(rng.choices(
+                        recipe_ids, cum_weights=popular, k=count))
+                ]
+                if len(objects) >= self.batch_size:
+                    self.bulk(model, objects)
+                    objects = []
+            self.bulk(model, objects)
+
+        objects = []
+        for user_id in user_ids:
+            count = min(len(user_ids),
+                        int(rng.expovariate(
+                            1 / options['subscriptions_per_user'])))
+            objects += [
+                Subscribe(user_id=user_id, author_id=author_id)
+                for author_id in set(rng.choices(
+                    user_ids, cum_weights=authors, k=count))
+                if author_id != user_id
+            ]
+            if len(objects) >= self.batch_size:
+                self.bulk(Subscribe, objects)
+                objects = []
+        self.bulk(Subscribe, objects)
+
+        call_command('recount_counters', stdout=self.stdout)
+        call_command('check_shopping_lists', verbosity=0,
+                     stdout=self.stdout)
+        self.stdout.write(self.style.SUCCESS(
+            f'Готово за {perf_counter() - start:.1f} с'))
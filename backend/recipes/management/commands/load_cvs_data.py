@@ -1,17 +1,90 @@
+import json
 from csv import reader
-from django.core.management.base import BaseCommand
+from itertools import islice
+from pathlib import Path
+from time import perf_counter
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
 
 from recipes.models import Ingredient
+from recipes.signals import ingredients_loaded
+
+DEFAULT_PATH = Path(settings.BASE_DIR) / 'recipes' / 'data' / 'ingredients.csv'
+BLOCK_SIZE = 64 * 1024
+SEPARATORS = ', \t\r\n'
+
+
+def read_csv(file):
+    for row in reader(file):
+        if len(row) == 2:
+            yield row[0], row[1]
+
+
+def read_json(file):
+    """Потоковое чтение массива объектов без загрузки файла целиком"""
+    decoder = json.JSONDecoder()
+    buffer = ''
+    position = 0
+    opened = False
+    for block in iter(lambda: file.read(BLOCK_SIZE), ''):
+        buffer = buffer[position:] + block
+        position = 0
+        while True:
+            while position < len(buffer) and buffer[position] in SEPARATORS:
+                position += 1
+            if position == len(buffer):
+                break
+            if not opened:
+                if buffer[position] != '[':
+                    raise CommandError('Ожидается JSON-массив ингредиентов')
+                opened = True
+                position += 1
+                continue
+            if buffer[position] == ']':
+                return
+            try:
+                item, position = decoder.raw_decode(buffer, position)
+            except json.JSONDecodeError:
+                break
+            yield item['name'], item['measurement_unit']
+    raise CommandError('JSON-файл с ингредиентами оборван')
 
 
 class Command(BaseCommand):
     """Наполнение базы данных"""
+    help = 'Загружает ингредиенты из CSV или JSON пачками'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', nargs='?', default=DEFAULT_PATH)
+        parser.add_argument('--format', choices=('csv', 'json'))
+        parser.add_argument('--chunk-size', type=int, default=1000)
 
-    def handle(self, *args, **kwargs):
-        path = 'recipes/data/ingredients.csv'
+    def handle(self, *args, **options):
+        path = Path(options['path'])
+        file_format = options['format'] or path.suffix.lstrip('.').lower()
+        if file_format not in ('csv', 'json'):
+            raise CommandError(f'Неизвестный формат файла: {path}')
+        read = read_csv if file_format == 'csv' else read_json
+        start = perf_counter()
+        before = Ingredient.objects.count()
+        total = 0
         with open(path, 'r', encoding='utf-8') as f:
-            for row in reader(f):
-                if len(row) == 2:
-                    Ingredient.objects.get_or_create(
-                        name=row[0], measurement_unit=row[1],
-                    )
+            rows = read(f)
+            while True:
+                chunk = [
+                    Ingredient(name=name, measurement_unit=measurement_unit)
+                    for name, measurement_unit in islice(
+                        rows, options['chunk_size'])
+                ]
+                if not chunk:
+                    break
+                Ingredient.objects.bulk_create(chunk, ignore_conflicts=True)
+                total += len(chunk)
+        inserted = Ingredient.objects.count() - before
+        if inserted:
+            ingredients_loaded.send(sender=Ingredient)
+        self.stdout.write(self.style.SUCCESS(
+            f'Добавлено: {inserted}, пропущено: {total - inserted}, '
+            f'время: {perf_counter() - start:.2f} с'
+        ))
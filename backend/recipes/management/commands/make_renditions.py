@@ -0,0 +1,41 @@
+from concurrent.futures import ThreadPoolExecutor
+from time import perf_counter
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+
+from recipes.constants import IMAGE_WORKERS
+from recipes.images import make_renditions
+from recipes.models import Recipe
+
+
+class Command(BaseCommand):
+    """Уменьшенные копии для картинок, загруженных до появления обработки"""
+
+    def add_arguments(self, parser):
+        parser.add_argument('--all', action='store_true',
+                            help='Пересоздать копии для всех картинок')
+        parser.add_argument('--workers', type=int, default=IMAGE_WORKERS)
+
+    def process(self, image_name):
+        try:
+            make_renditions(image_name)
+        except Exception as error:
+            self.stderr.write(f'{image_name}: {error}')
+            return False
+        finally:
+            connection.close()
+        return True
+
+    def handle(self, *args, **options):
+        start = perf_counter()
+        recipes = Recipe.objects.exclude(image='')
+        if not options['all']:
+            recipes = recipes.filter(has_renditions=False)
+        names = list(recipes.values_list('image', flat=True).distinct())
+        with ThreadPoolExecutor(max_workers=options['workers']) as pool:
+            done = sum(pool.map(self.process, names))
+        self.stdout.write(self.style.SUCCESS(
+            f'Обработано: {done}, ошибок: {len(names) - done}, '
+            f'время: {perf_counter() - start:.2f} с'
+        ))
@@ -0,0 +1,27 @@
+from django.core.management.base import BaseCommand
+from django.db.models import F
+
+from recipes.counters import count_related
+from recipes.models import Favorite, Recipe, ShoppingCart
+from users.models import Subscribe, User
+
+COUNTERS = (
+    (Recipe, 'favorites_count', Favorite, 'recipe'),
+    (Recipe, 'in_shopping_cart_count', ShoppingCart, 'recipe'),
+    (User, 'recipes_count', Recipe, 'author'),
+    (User, 'followers_count', Subscribe, 'author'),
+)
+
+
+class Command(BaseCommand):
+    """Пересчёт денормализованных счётчиков рецептов и пользователей"""
+
+    def handle(self, *args, **options):
+        for model, counter, related_model, field in COUNTERS:
+            fixed = model.objects.annotate(
+                actual=count_related(related_model, field)
+            ).exclude(**{counter: F('actual')}).update(
+                **{counter: count_related(related_model, field)}
+            )
+            self.stdout.write(
+                f'{model.__name__}.{counter}: исправлено {fixed}')
@@ -0,0 +1,258 @@
+"""Обратный индекс ингредиент -> рецепты для подбора по продуктам.
+
+Индекс строится в каждом процессе и догоняет базу при каждом вызове
+get_matcher: изменённые рецепты видны по Recipe.updated_at, удалённые
+другими процессами - по отметкам DeletedRecipe.
+"""
+import time
+from array import array
+from bisect import bisect_left, insort
+from collections import Counter
+from collections.abc import Sequence
+from datetime import timedelta
+from threading import Lock, Thread
+
+from django.db import connection, transaction
+from django.utils import timezone
+
+from .constants import (MATCHER_DELETED_TTL, MATCHER_INDEX_TTL,
+                        MATCHER_SYNC_OVERLAP)
+from .models import DeletedRecipe, Recipe, RecipeIngredient
+
+_matcher = None
+_built_at = 0.0
+_synced_at = None
+_rebuilding = False
+_lock = Lock()
+_build_lock = Lock()
+
+
+def group_by_recipe(rows):
+    """Пары (рецепт, ингредиент), отсортированные по рецепту"""
+    recipe_id, ingredient_ids = None, []
+    for row_recipe_id, ingredient_id in rows:
+        if row_recipe_id != recipe_id:
+            if ingredient_ids:
+                yield recipe_id, ingredient_ids
+            recipe_id, ingredient_ids = row_recipe_id, []
+        ingredient_ids.append(ingredient_id)
+    if ingredient_ids:
+        yield recipe_id, ingredient_ids
+
+
+class Ranking(Sequence):
+    """Отсортированные ключи (-доля, недостаёт, -рецепт, найдено).
+
+    Разбираются в (рецепт, найдено, всего) только для запрошенной
+    страницы, чтобы сортировка шла по кортежам без функции-ключа.
+    """
+
+    def __init__(self, keys):
+        self.keys = keys
+
+    def __len__(self):
+        return len(self.keys)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self.decode(key) for key in self.keys[index]]
+        return self.decode(self.keys[index])
+
+    @staticmethod
+    def decode(key):
+        return -key[2], key[3], key[1] + key[3]
+
+
+class RecipeMatcher:
+    """Списки рецептов по ингредиентам в виде массивов целых чисел.
+
+    Состав рецептов на момент построения хранится одним плоским массивом
+    со смещениями, изменённые позже рецепты - в словаре поверх него.
+    """
+
+    def __init__(self, rows):
+        self.offsets = array('I', [0])
+        self.flat = array('I')
+        self.sizes = array('H', [0])
+        self.postings = {}
+        self.changed = {}
+        for recipe_id, ingredient_ids in group_by_recipe(rows):
+            self.offsets.extend(
+                [len(self.flat)] * (recipe_id + 1 - len(self.offsets)))
+            self.resize(recipe_id)
+            ingredient_ids = set(ingredient_ids)
+            for ingredient_id in ingredient_ids:
+                self.flat.append(ingredient_id)
+                self.postings.setdefault(
+                    ingredient_id, array('I')).append(recipe_id)
+            self.offsets.append(len(self.flat))
+            self.sizes[recipe_id] = len(ingredient_ids)
+
+    def resize(self, recipe_id):
+        if recipe_id >= len(self.sizes):
+            self.sizes.extend([0] * (recipe_id + 1 - len(self.sizes)))
+
+    def ingredients(self, recipe_id):
+        if recipe_id in self.changed:
+            return self.changed[recipe_id]
+        if recipe_id + 1 < len(self.offsets):
+            return self.flat[
+                self.offsets[recipe_id]:self.offsets[recipe_id + 1]]
+        return ()
+
+    def replace(self, recipe_id, ingredient_ids):
+        """Заменить состав рецепта, пустой состав удаляет рецепт.
+
+        Списки рецептов остаются отсортированными, поэтому место рецепта
+        в них ищется двоичным поиском.
+        """
+        old = set(self.ingredients(recipe_id))
+        new = set(ingredient_ids)
+        for ingredient_id in old - new:
+            postings = self.postings[ingredient_id]
+            index = bisect_left(postings, recipe_id)
+            if index < len(postings) and postings[index] == recipe_id:
+                del postings[index]
+        for ingredient_id in new - old:
+            insort(self.postings.setdefault(ingredient_id, array('I')),
+                   recipe_id)
+        self.changed[recipe_id] = tuple(new)
+        self.resize(recipe_id)
+        self.sizes[recipe_id] = len(new)
+
+    def match(self, ingredient_ids):
+        """Рецепты с хотя бы одним ингредиентом из набора.
+
+        Элементы - (рецепт, найдено, всего) по убыванию доли найденных
+        ингредиентов, затем по числу недостающих и от новых к старым.
+        """
+        counts = Counter()
+        for ingredient_id in set(ingredient_ids):
+            counts.update(self.postings.get(ingredient_id, ()))
+        sizes = self.sizes
+        keys = [
+            (-found / sizes[recipe_id], sizes[recipe_id] - found, -recipe_id,
+             found)
+            for recipe_id, found in counts.items()
+        ]
+        keys.sort()
+        return Ranking(keys)
+
+
+def build():
+    return RecipeMatcher(RecipeIngredient.objects.order_by(
+        'recipe_id').values_list('recipe_id', 'ingredient_id').iterator(
+        chunk_size=10000))
+
+
+def fetch_changes(since):
+    """Составы рецептов, изменённых или удалённых после since.
+
+    Рецепты без состава и удалённые получают пустой состав и убираются
+    из индекса. Сортировка, в том числе модели по умолчанию, снята: с ней
+    база обходит всю таблицу по другому индексу вместо индекса updated_at.
+    """
+    since -= timedelta(seconds=MATCHER_SYNC_OVERLAP)
+    changed = {}
+    for recipe_id, ingredient_id in Recipe.objects.filter(
+            updated_at__gt=since).order_by().values_list(
+            'id', 'recipeingredient__ingredient_id'):
+        ingredient_ids = changed.setdefault(recipe_id, [])
+        if ingredient_id is not None:
+            ingredient_ids.append(ingredient_id)
+    for recipe_id in DeletedRecipe.objects.filter(
+            deleted_at__gt=since).values_list('recipe_id', flat=True):
+        changed[recipe_id] = ()
+    return changed
+
+
+def apply_changes(matcher, changed):
+    for recipe_id, ingredient_ids in changed.items():
+        matcher.replace(recipe_id, ingredient_ids)
+
+
+def sync(matcher, since):
+    """Перечитать рецепты, изменённые или удалённые после since"""
+    apply_changes(matcher, fetch_changes(since))
+
+
+def rebuild():
+    """Построить индекс заново в фоне, пока запросы обслуживает старый"""
+    global _matcher, _built_at, _synced_at, _rebuilding
+    started_at = timezone.now()
+    try:
+        matcher = build()
+        with _lock:
+            _matcher, _built_at = matcher, time.monotonic()
+            _synced_at = started_at
+    finally:
+        _rebuilding = False
+        connection.close()
+
+
+def build_initial():
+    """Первое построение без общей блокировки.
+
+    Сигналы удаления и фоновое обновление не ждут его окончания, а
+    одновременные первые запросы ждут одно построение, а не делают свои.
+    Индекс, который давно не догонял базу, строится так же заново: старых
+    отметок об удалении уже может не быть.
+    """
+    global _matcher, _built_at, _synced_at
+    with _build_lock:
+        if not is_stale():
+            return
+        started_at = timezone.now()
+        matcher = build()
+        with _lock:
+            _matcher, _built_at = matcher, time.monotonic()
+            _synced_at = started_at
+
+
+def is_stale():
+    return _matcher is None or timezone.now() - _synced_at > timedelta(
+        seconds=MATCHER_DELETED_TTL - MATCHER_SYNC_OVERLAP)
+
+
+def get_matcher():
+    """Индекс процесса с изменениями, сделанными после прошлого вызова.
+
+    Изменения читаются из базы без блокировки, под ней только
+    применяются. Если за это время индекс перестроили или другой поток
+    применил более свежие изменения, прочитанное отбрасывается.
+    """
+    global _synced_at, _rebuilding
+    if is_stale():
+        build_initial()
+    with _lock:
+        if (not _rebuilding
+                and time.monotonic() - _built_at > MATCHER_INDEX_TTL):
+            _rebuilding = True
+            Thread(target=rebuild, daemon=True).start()
+        matcher, since = _matcher, _synced_at
+    now = timezone.now()
+    changed = fetch_changes(since)
+    with _lock:
+        if _matcher is matcher and now > _synced_at:
+            apply_changes(_matcher, changed)
+            _synced_at = now
+        return _matcher
+
+
+def forget_recipe(sender, instance, **kwargs):
+    """Убрать удалённый рецепт из индекса и оставить отметку для других.
+
+    Отметка пишется в транзакции удаления, а индекс меняется только после
+    её фиксации: при откате рецепт остаётся в подборе.
+    """
+    DeletedRecipe.objects.filter(deleted_at__lt=timezone.now() - timedelta(
+        seconds=MATCHER_DELETED_TTL)).delete()
+    DeletedRecipe.objects.create(recipe_id=instance.pk)
+    recipe_id = instance.pk
+
+    def forget():
+        with _lock:
+            if _matcher is not None:
+                _matcher.replace(recipe_id, ())
+
+    transaction.on_commit(forget)
@@ -0,0 +1,93 @@
+# Generated by Django 3.2.25 on 2026-10-18 18:40
+
+from django.db import migrations
+
+FTS_TABLE = 'recipes_recipe_fts'
+SQLITE_VALUES = ("replace(replace({0}.name, 'ё', 'е'), 'Ё', 'Е'), "
+                 "replace(replace({0}.text, 'ё', 'е'), 'Ё', 'Е')")
+STATEMENTS = {
+    'postgresql': (
+        (
+            """
+            ALTER TABLE recipes_recipe ADD COLUMN search_vector tsvector
+            GENERATED ALWAYS AS (
+                setweight(to_tsvector('russian', translate(name, 'ёЁ', 'еЕ')), 'A')
+                || setweight(to_tsvector('english', name), 'A')
+                || setweight(to_tsvector('russian', translate(text, 'ёЁ', 'еЕ')), 'B')
+                || setweight(to_tsvector('english', text), 'B')
+            ) STORED
+            """,
+            'CREATE INDEX recipe_search_vector_idx ON recipes_recipe '
+            'USING gin (search_vector)',
+        ),
+        (
+            'DROP INDEX IF EXISTS recipe_search_vector_idx',
+            'ALTER TABLE recipes_recipe DROP COLUMN IF EXISTS search_vector',
+        ),
+    ),
+    'sqlite': (
+        (
+            f"""
+            CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5(
+                name, text, tokenize='unicode61 remove_diacritics 2'
+            )
+            """,
+            f"""
+            CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_insert
+            AFTER INSERT ON recipes_recipe BEGIN
+                INSERT INTO {FTS_TABLE}(rowid, name, text)
+                VALUES (new.id, {SQLITE_VALUES.format('new')});
+            END
+            """,
+            f"""
+            CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_delete
+            AFTER DELETE ON recipes_recipe BEGIN
+                DELETE FROM {FTS_TABLE} WHERE rowid = old.id;
+            END
+            """,
+            f"""
+            CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_update
+            AFTER UPDATE OF name, text ON recipes_recipe BEGIN
+                UPDATE {FTS_TABLE} SET (name, text) =
+                ({SQLITE_VALUES.format('new')}) WHERE rowid = new.id;
+            END
+            """,
+            f'DELETE FROM {FTS_TABLE}',
+            f"INSERT INTO {FTS_TABLE}(rowid, name, text) "
+            f"SELECT id, {SQLITE_VALUES.format('recipes_recipe')} "
+            f"FROM recipes_recipe",
+        ),
+        (
+            f'DROP TRIGGER IF EXISTS {FTS_TABLE}_insert',
+            f'DROP TRIGGER IF EXISTS {FTS_TABLE}_delete',
+            f'DROP TRIGGER IF EXISTS {FTS_TABLE}_update',
+            f'DROP TABLE IF EXISTS {FTS_TABLE}',
+        ),
+    ),
+}
+
+
+def execute(schema_editor, index):
+    connection = schema_editor.connection
+    with connection.cursor() as cursor:
+        for statement in STATEMENTS.get(connection.vendor, ((), ()))[index]:
+            cursor.execute(statement)
+
+
+def create_search_index(apps, schema_editor):
+    execute(schema_editor, 0)
+
+
+def drop_search_index(apps, schema_editor):
+    execute(schema_editor, 1)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0007_recipe_updated_at'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
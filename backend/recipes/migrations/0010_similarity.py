@@ -0,0 +1,50 @@
+# Generated by Django 3.2.25 on 2026-10-18 17:09
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0009_recipe_updated_at_idx'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SimilarityBuild',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='Дата построения')),
+                ('full', models.BooleanField(verbose_name='Полное построение')),
+                ('with_cart', models.BooleanField(verbose_name='С учётом корзины')),
+                ('last_favorite_id', models.PositiveBigIntegerField(default=0, verbose_name='Последняя запись избранного')),
+                ('last_cart_id', models.PositiveBigIntegerField(default=0, verbose_name='Последняя запись корзины')),
+                ('recipes', models.PositiveIntegerField(default=0, verbose_name='Пересчитано рецептов')),
+                ('duration', models.FloatField(default=0, verbose_name='Длительность, с')),
+                ('memory', models.FloatField(default=0, verbose_name='Пик памяти, МБ')),
+            ],
+            options={
+                'verbose_name': 'Построение похожих рецептов',
+                'verbose_name_plural': 'Построения похожих рецептов',
+                'ordering': ('-created_at',),
+            },
+        ),
+        migrations.CreateModel(
+            name='RecipeSimilarity',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('score', models.FloatField(verbose_name='Сходство')),
+                ('recipe', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='similar', to='recipes.recipe', verbose_name='Рецепт')),
+                ('similar', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='recipes.recipe', verbose_name='Похожий рецепт')),
+            ],
+            options={
+                'verbose_name': 'Похожий рецепт',
+                'verbose_name_plural': 'Похожие рецепты',
+            },
+        ),
+        migrations.AddIndex(
+            model_name='recipesimilarity',
+            index=models.Index(fields=['recipe', '-score'], name='recipe_similarity_score_idx'),
+        ),
+    ]
@@ -31,6 +31,25 @@ class Tag(models.Model):
         return self.name
 
 
+class RecipeQuerySet(models.QuerySet):
+    """Рецепты с флагами текущего пользователя"""
+
+    def with_user_flags(self, user):
+        if not user.is_authenticated:
+            return self.annotate(
+                is_favorited=models.Value(
+                    False, output_field=models.BooleanField()),
+                is_in_shopping_cart=models.Value(
+                    False, output_field=models.BooleanField()),
+            )
+        return self.annotate(
+            is_favorited=models.Exists(Favorite.objects.filter(
+                user=user, recipe=models.OuterRef('pk'))),
+            is_in_shopping_cart=models.Exists(ShoppingCart.objects.filter(
+                user=user, recipe=models.OuterRef('pk'))),
+        )
+
+
 class Recipe(models.Model):
     name = models.CharField(
         max_length=MAX_LENGHT,
@@ -41,6 +60,11 @@ class Recipe(models.Model):
         blank=True,
         verbose_name='Картинка'
     )
+    has_renditions = models.BooleanField(
+        default=False,
+        editable=False,
+        verbose_name='Уменьшенные копии готовы'
+    )
     cooking_time = models.PositiveIntegerField(
         validators=[
             MinValueValidator(
@@ -74,9 +98,33 @@ class Recipe(models.Model):
         auto_now_add=True,
         verbose_name='Дата публикации',
     )
+    updated_at = models.DateTimeField(
+        auto_now=True,
+        verbose_name='Дата изменения',
+    )
+    favorites_count = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        verbose_name='Количество в избранных'
+    )
+    in_shopping_cart_count = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        verbose_name='Количество в списках покупок'
+    )
+
+    objects = RecipeQuerySet.as_manager()
 
     class Meta:
-        ordering = ('-pub_date',)
+        ordering = ('-pub_date', '-id')
+        indexes = [
+            models.Index(fields=['-pub_date', '-id'],
+                         name='recipe_pub_date_id_idx'),
+            models.Index(fields=['updated_at'],
+                         name='recipe_updated_at_idx'),
+            models.Index(fields=['author', '-pub_date', '-id'],
+                         name='recipe_author_pub_date_idx'),
+        ]
         verbose_name = 'Рецепт'
         verbose_name_plural = 'Рецепты'
 
@@ -181,3 +229,151 @@ class ShoppingCart(BaseFavoriteShoppingCart):
         ]
         verbose_name = 'Список покупок'
         verbose_name_plural = 'Список покупок'
+
+
+class ShoppingListItem(models.Model):
+    """Сводный список покупок, поддерживается при изменении корзины"""
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        verbose_name='Пользователь'
+    )
+    ingredient = models.ForeignKey(
+        Ingredient,
+        on_delete=models.CASCADE,
+        verbose_name='Ингредиент'
+    )
+    amount = models.IntegerField(
+        default=0,
+        verbose_name='Количество'
+    )
+
+    class Meta:
+        default_related_name = 'shopping_list'
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'ingredient'],
+                name='unique_shopping_list_item'
+            )
+        ]
+        verbose_name = 'Позиция списка покупок'
+        verbose_name_plural = 'Сводный список покупок'
+
+    def __str__(self):
+        return f'{self.user} {self.ingredient} {self.amount}'
+
+
+class RecipeSimilarity(models.Model):
+    """Похожий рецепт по совместному добавлению в избранное"""
+    recipe = models.ForeignKey(
+        Recipe,
+        on_delete=models.CASCADE,
+        related_name='similar',
+        verbose_name='Рецепт'
+    )
+    similar = models.ForeignKey(
+        Recipe,
+        on_delete=models.CASCADE,
+        related_name='+',
+        verbose_name='Похожий рецепт'
+    )
+    score = models.FloatField(verbose_name='Сходство')
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['recipe', '-score'],
+                         name='recipe_similarity_score_idx'),
+        ]
+        verbose_name = 'Похожий рецепт'
+        verbose_name_plural = 'Похожие рецепты'
+
+    def __str__(self):
+        return f'{self.recipe} ~ {self.similar} {self.score:.3f}'
+
+
+class SimilarityBuild(models.Model):
+    """Построение похожих рецептов, отметка для инкрементального обновления"""
+    created_at = models.DateTimeField(
+        auto_now_add=True,
+        verbose_name='Дата построения'
+    )
+    full = models.BooleanField(verbose_name='Полное построение')
+    with_cart = models.BooleanField(verbose_name='С учётом корзины')
+    last_favorite_id = models.PositiveBigIntegerField(
+        default=0,
+        verbose_name='Последняя запись избранного'
+    )
+    last_cart_id = models.PositiveBigIntegerField(
+        default=0,
+        verbose_name='Последняя запись корзины'
+    )
+    recipes = models.PositiveIntegerField(
+        default=0,
+        verbose_name='Пересчитано рецептов'
+    )
+    duration = models.FloatField(
+        default=0,
+        verbose_name='Длительность, с'
+    )
+    memory = models.FloatField(
+        default=0,
+        verbose_name='Пик памяти, МБ'
+    )
+
+    class Meta:
+        ordering = ('-created_at',)
+        verbose_name = 'Построение похожих рецептов'
+        verbose_name_plural = 'Построения похожих рецептов'
+
+    def __str__(self):
+        return f'{self.created_at:%Y-%m-%d %H:%M} {self.recipes}'
+
+
+class FeedItem(models.Model):
+    """Рецепт во входящих подписчика, заполняется при публикации"""
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        verbose_name='Пользователь'
+    )
+    recipe = models.ForeignKey(
+        Recipe,
+        on_delete=models.CASCADE,
+        verbose_name='Рецепт'
+    )
+    pub_date = models.DateTimeField(verbose_name='Дата публикации')
+
+    class Meta:
+        default_related_name = 'feed'
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'recipe'],
+                name='unique_feed_item'
+            )
+        ]
+        indexes = [
+            models.Index(fields=['user', '-pub_date', '-recipe'],
+                         name='feed_item_user_pub_date_idx'),
+        ]
+        verbose_name = 'Рецепт в ленте'
+        verbose_name_plural = 'Входящие ленты'
+
+    def __str__(self):
+        return f'{self.user} {self.recipe}'
+
+
+class DeletedRecipe(models.Model):
+    """Отметка об удалении рецепта для индексов в памяти других процессов"""
+    recipe_id = models.PositiveBigIntegerField(verbose_name='Рецепт')
+    deleted_at = models.DateTimeField(
+        auto_now_add=True,
+        db_index=True,
+        verbose_name='Дата удаления'
+    )
+
+    class Meta:
+        verbose_name = 'Удалённый рецепт'
+        verbose_name_plural = 'Удалённые рецепты'
+
+    def __str__(self):
+        return f'{self.recipe_id} {self.deleted_at}'
@@ -0,0 +1,133 @@
+"""Полнотекстовый поиск рецептов по названию и описанию.
+
+В PostgreSQL это генерируемая колонка tsvector с GIN-индексом, в SQLite
+для локального запуска - таблица FTS5, которую обновляют триггеры. Их
+создаёт миграция 0008, в SQLite после миграций их проверяет ensure_index.
+"""
+import re
+
+from django.db import NotSupportedError
+from django.db.models import BooleanField, F, FloatField, Func
+
+FTS_TABLE = 'recipes_recipe_fts'
+TSQUERY = ("(websearch_to_tsquery('russian', %s) "
+           "|| websearch_to_tsquery('english', %s))")
+
+SQLITE_VALUES = ("replace(replace({0}.name, 'ё', 'е'), 'Ё', 'Е'), "
+                 "replace(replace({0}.text, 'ё', 'е'), 'Ё', 'Е')")
+SQLITE_CREATE = (
+    f"""
+    CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5(
+        name, text, tokenize='unicode61 remove_diacritics 2'
+    )
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_insert
+    AFTER INSERT ON recipes_recipe BEGIN
+        INSERT INTO {FTS_TABLE}(rowid, name, text)
+        VALUES (new.id, {SQLITE_VALUES.format('new')});
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_delete
+    AFTER DELETE ON recipes_recipe BEGIN
+        DELETE FROM {FTS_TABLE} WHERE rowid = old.id;
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_update
+    AFTER UPDATE OF name, text ON recipes_recipe BEGIN
+        UPDATE {FTS_TABLE} SET (name, text) =
+        ({SQLITE_VALUES.format('new')}) WHERE rowid = new.id;
+    END
+    """,
+    f'DELETE FROM {FTS_TABLE}',
+    f"INSERT INTO {FTS_TABLE}(rowid, name, text) "
+    f"SELECT id, {SQLITE_VALUES.format('recipes_recipe')} "
+    f"FROM recipes_recipe",
+)
+SQLITE_OBJECTS = {
+    FTS_TABLE,
+    *(f'{FTS_TABLE}_{event}' for event in ('insert', 'delete', 'update')),
+}
+
+
+def ensure_index(sender, using, **kwargs):
+    """Вернуть таблицу и триггеры FTS5, если миграция их удалила.
+
+    В SQLite изменение таблицы рецептов пересоздаёт её без триггеров.
+    Индекс перестраивается, только если чего-то не хватает, а не при
+    каждом migrate.
+    """
+    from django.db import connections
+
+    connection = connections[using]
+    if sender.name != 'recipes' or connection.vendor != 'sqlite':
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT name FROM sqlite_master WHERE type IN ('table', 'trigger')"
+            " AND name IN (%s, %s, %s, %s)", sorted(SQLITE_OBJECTS))
+        if {name for name, in cursor.fetchall()} == SQLITE_OBJECTS:
+            return
+        for statement in SQLITE_CREATE:
+            cursor.execute(statement)
+
+
+def normalize(query):
+    return query.replace('ё', 'е').replace('Ё', 'Е')
+
+
+def search_words(query):
+    return re.findall(r'\w+', query)
+
+
+class SearchExpression(Func):
+    """Выражение над строкой рецепта, которое зависит от поискового запроса"""
+
+    def __init__(self, query):
+        super().__init__(F('pk'))
+        self.query = normalize(query)
+
+    def table(self, connection):
+        return connection.ops.quote_name(self.source_expressions[0].alias)
+
+    def fts_query(self):
+        return ' '.join(
+            '"{}"'.format(word) for word in search_words(self.query))
+
+    def as_sql(self, compiler, connection, **extra_context):
+        raise NotSupportedError(
+            'Полнотекстовый поиск доступен только в PostgreSQL и SQLite')
+
+
+class SearchMatch(SearchExpression):
+    """Рецепт подходит под запрос"""
+    output_field = BooleanField()
+
+    def as_postgresql(self, compiler, connection, **extra_context):
+        return (f'{self.table(connection)}.search_vector @@ {TSQUERY}',
+                [self.query, self.query])
+
+    def as_sqlite(self, compiler, connection, **extra_context):
+        pk, params = compiler.compile(self.source_expressions[0])
+        return (f'{pk} IN (SELECT rowid FROM {FTS_TABLE} '
+                f'WHERE {FTS_TABLE} MATCH %s)',
+                [*params, self.fts_query()])
+
+
+class SearchRank(SearchExpression):
+    """Релевантность рецепта, чем больше, тем лучше"""
+    output_field = FloatField()
+
+    def as_postgresql(self, compiler, connection, **extra_context):
+        return (f'ts_rank({self.table(connection)}.search_vector, {TSQUERY})',
+                [self.query, self.query])
+
+    def as_sqlite(self, compiler, connection, **extra_context):
+        # bm25 в коррелированном подзапросе пересчитывает MATCH для каждой
+        # строки, поэтому локально выше просто совпадения в названии
+        pk, params = compiler.compile(self.source_expressions[0])
+        return (f'CASE WHEN {pk} IN (SELECT rowid FROM {FTS_TABLE} '
+                f'WHERE {FTS_TABLE} MATCH %s) THEN 1.0 ELSE 0.0 END',
+                [*params, f'name : ({self.fts_query()})'])
@@ -0,0 +1,70 @@
+"""Сводный список покупок, который обновляется приращениями"""
+from collections import defaultdict
+
+from django.db import transaction
+from django.db.models import Case, F, IntegerField, Sum, Value, When
+
+from .models import RecipeIngredient, ShoppingCart, ShoppingListItem
+
+
+def recipe_amounts(recipe_id, sign=1):
+    amounts = defaultdict(int)
+    for ingredient_id, amount in RecipeIngredient.objects.filter(
+            recipe_id=recipe_id).values_list('ingredient_id', 'amount'):
+        amounts[ingredient_id] += sign * amount
+    return amounts
+
+
+def apply_deltas(user_ids, deltas):
+    """Прибавить к списку каждого пользователя {ingredient_id: delta}"""
+    deltas = {
+        ingredient_id: delta
+        for ingredient_id, delta in deltas.items() if delta
+    }
+    if not user_ids or not deltas:
+        return
+    with transaction.atomic():
+        ShoppingListItem.objects.bulk_create(
+            (ShoppingListItem(user_id=user_id, ingredient_id=ingredient_id)
+             for user_id in user_ids for ingredient_id in deltas),
+            batch_size=1000,
+            ignore_conflicts=True
+        )
+        items = ShoppingListItem.objects.filter(
+            user_id__in=user_ids, ingredient_id__in=deltas)
+        items.update(amount=F('amount') + Case(
+            *(When(ingredient_id=ingredient_id, then=Value(delta))
+              for ingredient_id, delta in deltas.items()),
+            output_field=IntegerField()
+        ))
+        items.filter(amount__lte=0).delete()
+
+
+def add_recipe(user_id, recipe_id):
+    apply_deltas([user_id], recipe_amounts(recipe_id))
+
+
+def remove_recipe(user_id, recipe_id):
+    apply_deltas([user_id], recipe_amounts(recipe_id, sign=-1))
+
+
+def change_recipe(recipe_id, deltas):
+    """Изменились ингредиенты рецепта, который лежит в чьих-то корзинах"""
+    apply_deltas(
+        list(ShoppingCart.objects.filter(
+            recipe_id=recipe_id).values_list('user_id', flat=True)),
+        deltas
+    )
+
+
+def expected_items():
+    """Список покупок, посчитанный заново по корзинам"""
+    return {
+        (item['recipe__shopping_recipe__user'], item['ingredient']):
+            item['total']
+        for item in RecipeIngredient.objects.filter(
+            recipe__shopping_recipe__isnull=False
+        ).values(
+            'recipe__shopping_recipe__user', 'ingredient'
+        ).annotate(total=Sum('amount')).order_by()
+    }
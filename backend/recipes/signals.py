@@ -0,0 +1,215 @@
+from django.db.models.signals import (post_delete, post_migrate, post_save,
+                                      pre_delete, pre_save)
+from django.dispatch import Signal, receiver
+from django.utils import timezone
+
+from users.models import Subscribe, User
+from . import composition, shopping_list
+from .counters import change_counter
+from .feed import fan_out, fill_inbox
+from .images import schedule_deletion
+from .ingredient_index import invalidate_index
+from .matcher import forget_recipe
+from .models import (FeedItem, Favorite, Ingredient, Recipe, RecipeIngredient,
+                     ShoppingCart, Tag)
+from .search import ensure_index
+
+RECIPE_COUNTERS = {
+    Favorite: 'favorites_count',
+    ShoppingCart: 'in_shopping_cart_count',
+}
+AUTHOR_FIELDS = {'email', 'username', 'first_name', 'last_name'}
+VISIBLE_FIELDS = {
+    Tag: ('name', 'slug', 'color'),
+    Ingredient: ('name', 'measurement_unit'),
+}
+
+# Ингредиенты добавлены в обход save(), например bulk_create
+ingredients_loaded = Signal()
+
+post_save.connect(invalidate_index, sender=Ingredient,
+                  dispatch_uid='ingredient_index_save')
+post_delete.connect(invalidate_index, sender=Ingredient,
+                    dispatch_uid='ingredient_index_delete')
+ingredients_loaded.connect(invalidate_index,
+                           dispatch_uid='ingredient_index_loaded')
+post_migrate.connect(ensure_index, dispatch_uid='recipe_search_index')
+post_delete.connect(forget_recipe, sender=Recipe,
+                    dispatch_uid='recipe_matcher_forget')
+
+
+@receiver(post_save, sender=ShoppingCart,
+          dispatch_uid='shopping_list_add_recipe')
+def add_to_shopping_list(sender, instance, created, **kwargs):
+    if created:
+        shopping_list.add_recipe(instance.user_id, instance.recipe_id)
+
+
+@receiver(pre_delete, sender=ShoppingCart,
+          dispatch_uid='shopping_list_remove_recipe')
+def remove_from_shopping_list(sender, instance, **kwargs):
+    shopping_list.remove_recipe(instance.user_id, instance.recipe_id)
+
+
+@receiver(pre_save, sender=RecipeIngredient,
+          dispatch_uid='composition_remember')
+def remember_composition(sender, instance, raw, **kwargs):
+    instance._previous = None
+    if instance.pk is not None and not raw:
+        instance._previous = RecipeIngredient.objects.filter(
+            pk=instance.pk
+        ).values_list('recipe_id', 'ingredient_id', 'amount').first()
+
+
+@receiver(post_save, sender=RecipeIngredient,
+          dispatch_uid='composition_save')
+def record_composition_save(sender, instance, raw, **kwargs):
+    if raw:
+        return
+    deltas = {instance.ingredient_id: instance.amount}
+    previous = getattr(instance, '_previous', None)
+    if previous is not None:
+        recipe_id, ingredient_id, amount = previous
+        if recipe_id == instance.recipe_id:
+            deltas[ingredient_id] = deltas.get(ingredient_id, 0) - amount
+        else:
+            composition.record(recipe_id, {ingredient_id: -amount})
+    composition.record(instance.recipe_id, deltas)
+
+
+@receiver(post_delete, sender=RecipeIngredient,
+          dispatch_uid='composition_delete')
+def record_composition_delete(sender, instance, **kwargs):
+    composition.record(instance.recipe_id,
+                       {instance.ingredient_id: -instance.amount})
+
+
+@receiver(pre_delete, sender=Recipe, dispatch_uid='composition_recipe_delete')
+def start_recipe_delete(sender, instance, **kwargs):
+    composition.start_deleting(instance.pk)
+
+
+@receiver(post_delete, sender=Recipe,
+          dispatch_uid='composition_recipe_deleted')
+def finish_recipe_delete(sender, instance, **kwargs):
+    composition.finish_deleting(instance.pk)
+
+
+@receiver(pre_save, sender=Recipe, dispatch_uid='recipe_image_remember')
+def remember_image(sender, instance, raw, update_fields, **kwargs):
+    instance._previous_image = None
+    if (instance.pk is None or raw
+            or update_fields is not None and 'image' not in update_fields):
+        return
+    instance._previous_image = Recipe.objects.filter(
+        pk=instance.pk).values_list('image', flat=True).first()
+
+
+@receiver(post_save, sender=Recipe, dispatch_uid='recipe_image_replaced')
+def delete_replaced_image(sender, instance, **kwargs):
+    previous = getattr(instance, '_previous_image', None)
+    if previous and previous != instance.image.name:
+        schedule_deletion(previous)
+
+
+@receiver(post_delete, sender=Recipe, dispatch_uid='recipe_image_deleted')
+def delete_recipe_image(sender, instance, **kwargs):
+    schedule_deletion(instance.image.name)
+
+
+@receiver(post_save, sender=Recipe, dispatch_uid='recipes_count_add')
+def add_recipe(sender, instance, created, **kwargs):
+    if created:
+        change_counter(User.objects.filter(pk=instance.author_id),
+                       'recipes_count', 1)
+
+
+@receiver(post_save, sender=Recipe, dispatch_uid='feed_fan_out')
+def add_to_feeds(sender, instance, created, **kwargs):
+    if created:
+        fan_out(instance)
+
+
+@receiver(post_save, sender=Subscribe, dispatch_uid='feed_subscribe')
+def fill_feed(sender, instance, created, **kwargs):
+    if created and instance.user.has_feed_inbox:
+        fill_inbox(instance.user_id, [instance.author_id])
+
+
+@receiver(post_delete, sender=Subscribe, dispatch_uid='feed_unsubscribe')
+def clear_feed(sender, instance, **kwargs):
+    FeedItem.objects.filter(user_id=instance.user_id,
+                            recipe__author_id=instance.author_id).delete()
+
+
+@receiver(post_delete, sender=Recipe, dispatch_uid='recipes_count_remove')
+def remove_recipe(sender, instance, **kwargs):
+    change_counter(User.objects.filter(pk=instance.author_id),
+                   'recipes_count', -1)
+
+
+@receiver(post_save, sender=Favorite, dispatch_uid='favorites_count_add')
+@receiver(post_save, sender=ShoppingCart,
+          dispatch_uid='in_shopping_cart_count_add')
+def add_to_recipe_counter(sender, instance, created, **kwargs):
+    if created:
+        change_counter(Recipe.objects.filter(pk=instance.recipe_id),
+                       RECIPE_COUNTERS[sender], 1)
+
+
+@receiver(post_delete, sender=Favorite,
+          dispatch_uid='favorites_count_remove')
+@receiver(post_delete, sender=ShoppingCart,
+          dispatch_uid='in_shopping_cart_count_remove')
+def remove_from_recipe_counter(sender, instance, **kwargs):
+    change_counter(Recipe.objects.filter(pk=instance.recipe_id),
+                   RECIPE_COUNTERS[sender], -1)
+
+
+@receiver(pre_save, sender=Tag, dispatch_uid='recipes_touch_tag_remember')
+@receiver(pre_save, sender=Ingredient,
+          dispatch_uid='recipes_touch_ingredient_remember')
+def remember_visible_fields(sender, instance, raw, **kwargs):
+    instance._visible = None
+    if instance.pk is not None and not raw:
+        instance._visible = sender.objects.filter(
+            pk=instance.pk).values_list(*VISIBLE_FIELDS[sender]).first()
+
+
+def visible_fields_changed(sender, instance, created):
+    """Изменилось ли то, что рецепты показывают о теге или ингредиенте"""
+    if created:
+        return False
+    return getattr(instance, '_visible', None) != tuple(
+        getattr(instance, field) for field in VISIBLE_FIELDS[sender])
+
+
+@receiver(post_save, sender=Tag, dispatch_uid='recipes_touch_tag_save')
+@receiver(pre_delete, sender=Tag, dispatch_uid='recipes_touch_tag_delete')
+def touch_tag_recipes(sender, instance, created=False, **kwargs):
+    if kwargs['signal'] is post_save and not visible_fields_changed(
+            sender, instance, created):
+        return
+    Recipe.objects.filter(tags=instance).update(
+        updated_at=timezone.now())
+
+
+@receiver(post_save, sender=Ingredient,
+          dispatch_uid='recipes_touch_ingredient_save')
+@receiver(pre_delete, sender=Ingredient,
+          dispatch_uid='recipes_touch_ingredient_delete')
+def touch_ingredient_recipes(sender, instance, created=False, **kwargs):
+    if kwargs['signal'] is post_save and not visible_fields_changed(
+            sender, instance, created):
+        return
+    Recipe.objects.filter(ingredients=instance).update(
+        updated_at=timezone.now())
+
+
+@receiver(post_save, sender=User, dispatch_uid='recipes_touch_author_save')
+def touch_author_recipes(sender, instance, created, update_fields, **kwargs):
+    if created or (update_fields is not None
+                   and not AUTHOR_FIELDS & set(update_fields)):
+        return
+    Recipe.objects.filter(author=instance).update(
+        updated_at=timezone.now())
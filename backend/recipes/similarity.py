@@ -0,0 +1,180 @@
+"""Похожие рецепты по совместному добавлению в избранное.
+
+Матрица пользователь x рецепт хранится разреженно: рецепты каждого
+пользователя и пользователи каждого рецепта - массивы целых чисел.
+Строка сходства считается для одного рецепта за раз, поэтому память
+ограничена размером самой матрицы, а не числом пар рецептов.
+"""
+from array import array
+from collections import Counter
+from heapq import nlargest
+from itertools import groupby, islice
+from math import sqrt
+from operator import itemgetter
+
+from django.db import connection, transaction
+from django.db.models import Max
+
+from .constants import (SIMILAR_CART_WEIGHT, SIMILAR_MAX_USER_ITEMS,
+                        SIMILAR_TOP_K, SIMILAR_WRITE_CHUNK)
+from .models import Favorite, RecipeSimilarity, ShoppingCart
+
+EMPTY = array('I')
+
+
+def read_lists(queryset, max_items):
+    """Рецепты каждого пользователя, не больше max_items последних"""
+    rows = queryset.order_by('user_id', '-id').values_list(
+        'user_id', 'recipe_id').iterator(chunk_size=10000)
+    for user_id, group in groupby(rows, key=itemgetter(0)):
+        yield user_id, array(
+            'I', (recipe_id for _, recipe_id in islice(group, max_items)))
+
+
+class CoOccurrence:
+    """Разреженная матрица избранного и корзины.
+
+    Вес рецепта в избранном - 1, только в корзине - cart_weight.
+    Скалярное произведение строк раскладывается на три счётчика
+    (избранное-избранное, избранное-корзина, корзина-корзина), которые
+    заполняются Counter.update сразу целыми массивами рецептов.
+    """
+
+    def __init__(self, favorites, carts=(), cart_weight=SIMILAR_CART_WEIGHT):
+        self.cart_weight = cart_weight
+        self.users = {}
+        self.favorites = []
+        self.carts = []
+        for user_id, recipe_ids in favorites:
+            self.users[user_id] = len(self.favorites)
+            self.favorites.append(recipe_ids)
+            self.carts.append(EMPTY)
+        for user_id, recipe_ids in carts:
+            index = self.users.get(user_id)
+            if index is None:
+                self.users[user_id] = len(self.favorites)
+                self.favorites.append(EMPTY)
+                self.carts.append(recipe_ids)
+            else:
+                favorite = set(self.favorites[index])
+                self.carts[index] = array('I', (
+                    recipe_id for recipe_id in recipe_ids
+                    if recipe_id not in favorite))
+        self.favorite_users = self.postings(self.favorites)
+        self.cart_users = self.postings(self.carts)
+        weight = cart_weight * cart_weight
+        self.inverse_norms = {
+            recipe_id: 1 / sqrt(
+                len(self.favorite_users.get(recipe_id, ()))
+                + weight * len(self.cart_users.get(recipe_id, ())))
+            for recipe_id in self.favorite_users.keys() | self.cart_users
+        }
+
+    @staticmethod
+    def postings(lists):
+        postings = {}
+        for index, recipe_ids in enumerate(lists):
+            for recipe_id in recipe_ids:
+                postings.setdefault(recipe_id, array('I')).append(index)
+        return postings
+
+    def recipe_ids(self):
+        return sorted(self.inverse_norms)
+
+    def user_recipes(self, user_id):
+        index = self.users.get(user_id)
+        if index is None:
+            return ()
+        return (*self.favorites[index], *self.carts[index])
+
+    def neighbours(self, recipe_id, top_k=SIMILAR_TOP_K):
+        """Не больше top_k пар (косинусное сходство, рецепт)"""
+        favorite, mixed, cart = Counter(), Counter(), Counter()
+        for index in self.favorite_users.get(recipe_id, ()):
+            favorite.update(self.favorites[index])
+            mixed.update(self.carts[index])
+        for index in self.cart_users.get(recipe_id, ()):
+            mixed.update(self.favorites[index])
+            cart.update(self.carts[index])
+        inverse_norm = self.inverse_norms.get(recipe_id)
+        if inverse_norm is None:
+            return []
+        scores, weight = favorite, self.cart_weight
+        for other, count in mixed.items():
+            scores[other] += weight * count
+        for other, count in cart.items():
+            scores[other] += weight * weight * count
+        scores.pop(recipe_id, None)
+        inverse_norms = self.inverse_norms
+        return [(score * inverse_norm, other) for score, other in nlargest(
+            top_k, ((score * inverse_norms[other], other)
+                    for other, score in scores.items()))]
+
+
+def load(with_cart=False, max_items=SIMILAR_MAX_USER_ITEMS,
+         cart_weight=SIMILAR_CART_WEIGHT):
+    carts = read_lists(ShoppingCart.objects.all(), max_items) if with_cart else ()
+    return CoOccurrence(read_lists(Favorite.objects.all(), max_items),
+                        carts, cart_weight)
+
+
+def last_ids(with_cart=False):
+    """Отметки, после которых записи попадут в следующее обновление"""
+    last_favorite_id = Favorite.objects.aggregate(last=Max('id'))['last']
+    last_cart_id = (ShoppingCart.objects.aggregate(last=Max('id'))['last']
+                    if with_cart else 0)
+    return last_favorite_id or 0, last_cart_id or 0
+
+
+def changed_recipes(matrix, build):
+    """Рецепты, строки которых изменили записи после прошлого построения.
+
+    Это сами добавленные рецепты и всё, что есть у тех же пользователей.
+    Удалённые записи и сдвиг норм у остальных рецептов учитывает только
+    полное построение.
+    """
+    rows = list(Favorite.objects.filter(
+        id__gt=build.last_favorite_id).values_list('user_id', 'recipe_id'))
+    if build.with_cart:
+        rows += ShoppingCart.objects.filter(
+            id__gt=build.last_cart_id).values_list('user_id', 'recipe_id')
+    recipe_ids = {recipe_id for _, recipe_id in rows}
+    for user_id in {user_id for user_id, _ in rows}:
+        recipe_ids.update(matrix.user_recipes(user_id))
+    return sorted(recipe_ids)
+
+
+def insert_sql():
+    meta = RecipeSimilarity._meta
+    columns = ', '.join(connection.ops.quote_name(meta.get_field(name).column)
+                        for name in ('recipe', 'similar', 'score'))
+    return (f'INSERT INTO {connection.ops.quote_name(meta.db_table)} '
+            f'({columns}) VALUES (%s, %s, %s)')
+
+
+def store(matrix, recipe_ids, top_k=SIMILAR_TOP_K, full=False):
+    """Пересчитать строки сходства и заменить их в таблице порциями.
+
+    Строки пишутся executemany без создания объектов моделей: на сотнях
+    тысяч строк bulk_create тратит больше времени, чем сам расчёт.
+    При полном построении порция заменяет весь диапазон id, так что
+    пропадают и строки рецептов, у которых не осталось записей.
+    """
+    sql = insert_sql()
+    previous = 0
+    for start in range(0, max(len(recipe_ids), 1), SIMILAR_WRITE_CHUNK):
+        chunk = recipe_ids[start:start + SIMILAR_WRITE_CHUNK]
+        rows = [
+            (recipe_id, similar_id, score)
+            for recipe_id in chunk
+            for score, similar_id in matrix.neighbours(recipe_id, top_k)
+        ]
+        stale = RecipeSimilarity.objects.filter(recipe_id__in=chunk)
+        if full:
+            stale = RecipeSimilarity.objects.filter(recipe_id__gt=previous)
+            if start + SIMILAR_WRITE_CHUNK < len(recipe_ids):
+                stale = stale.filter(recipe_id__lte=chunk[-1])
+                previous = chunk[-1]
+        with transaction.atomic(), connection.cursor() as cursor:
+            stale.delete()
+            cursor.executemany(sql, rows)
@@ -12,7 +12,10 @@ class UserAdmin(admin.ModelAdmin):
         'first_name',
         'last_name',
         'is_staff',
-        'date_joined'
+        'date_joined',
+        'recipes_count',
+        'followers_count',
+        'has_feed_inbox'
     ]
 
     search_fields = [
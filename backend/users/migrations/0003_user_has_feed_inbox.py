@@ -0,0 +1,18 @@
+# Generated by Django 3.2.25 on 2026-10-18 17:15
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0002_counters'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='user',
+            name='has_feed_inbox',
+            field=models.BooleanField(default=False, verbose_name='Лента из входящих'),
+        ),
+    ]
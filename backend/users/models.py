@@ -27,6 +27,20 @@ class User(AbstractUser):
         max_length=USERNAME_NAME,
         verbose_name='Пароль'
     )
+    recipes_count = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        verbose_name='Количество рецептов'
+    )
+    followers_count = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        verbose_name='Количество подписчиков'
+    )
+    has_feed_inbox = models.BooleanField(
+        default=False,
+        verbose_name='Лента из входящих'
+    )
 
     class Meta:
         verbose_name = 'Пользователь'
@@ -19,10 +19,15 @@ class CustomUserSerializer(UserSerializer):
 
     def get_is_subscribed(self, obj):
         request = self.context.get('request')
-        return (request and request.user.is_authenticated
-                and Subscribe.objects.filter(
-                    user=request.user, author=obj
-                ).exists())
+        if not (request and request.user.is_authenticated):
+            return False
+        if not hasattr(request, 'subscribed_ids'):
+            request.subscribed_ids = set(
+                Subscribe.objects.filter(
+                    user=request.user
+                ).values_list('author_id', flat=True)
+            )
+        return obj.id in request.subscribed_ids
 
 
 class CustomUserCreateSerializer(UserCreateSerializer):
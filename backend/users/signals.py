@@ -0,0 +1,19 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from recipes.counters import change_counter
+from .models import Subscribe, User
+
+
+@receiver(post_save, sender=Subscribe, dispatch_uid='followers_count_add')
+def add_follower(sender, instance, created, **kwargs):
+    if created:
+        change_counter(User.objects.filter(pk=instance.author_id),
+                       'followers_count', 1)
+
+
+@receiver(post_delete, sender=Subscribe,
+          dispatch_uid='followers_count_remove')
+def remove_follower(sender, instance, **kwargs):
+    change_counter(User.objects.filter(pk=instance.author_id),
+                   'followers_count', -1)
@@ -1,11 +1,12 @@
 from djoser.views import UserViewSet
 from rest_framework.permissions import IsAuthenticatedOrReadOnly
 
+from api.middleware import SerializationTimingMixin
 from .models import User
 from .serializers import CustomUserSerializer
 
 
-class CustomUserViewSet(UserViewSet):
+class CustomUserViewSet(SerializationTimingMixin, UserViewSet):
 
     queryset = User.objects.all()
     serializer_class = CustomUserSerializer